@@ -0,0 +1,161 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import contextlib
+from datetime import datetime, timezone
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+import codigo_completo as cc
+from panel import construir_panel
+from esquemas import FACTORES
+from intervalos import resumir_por_intervalos
+from similares import construir_indice_similares
+from datos_sinteticos import generar_dataset
+
+# -----------------------------------------------------------
+# Benchmarks de las etapas principales del análisis
+# -----------------------------------------------------------
+# Para cada tamaño se genera un dataset sintético y se mide tiempo (mejor de
+# `repeticiones`) y memoria pico (tracemalloc) de cada etapa. El resultado se
+# guarda en JSON junto con el commit para comparar entre versiones:
+#   python benchmarks/bench_pipeline.py --tamanos 1000,100000
+#   python benchmarks/bench_pipeline.py --comparar benchmarks/resultados/<commit>.json
+
+TAMANOS = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def medir(funcion, repeticiones=3):
+    # Los tiempos se toman sin tracemalloc (que los infla); la memoria pico en una corrida aparte
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            funcion()
+        tiempos.append(time.perf_counter() - inicio)
+        plt.close("all")
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        funcion()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    plt.close("all")
+    return {"tiempo_s": min(tiempos), "tiempos_s": tiempos, "memoria_pico_mb": pico / 2 ** 20}
+
+
+def entre_anios_groupby(df):
+    # Lo mismo que entre_anios_panel sobre el formato largo: cambio por país,
+    # ranking de cada año y z-score de cada variable por año
+    por_pais = df.groupby(["Country", "Year"], observed=True)[FACTORES + ["Happiness"]].mean().reset_index()
+    delta = por_pais.groupby("Country", observed=True)["Happiness"].diff()
+    rangos = por_pais.groupby("Year")["Happiness"].rank(ascending=False, method="first")
+    z = por_pais.groupby("Year")[FACTORES + ["Happiness"]].transform(lambda s: (s - s.mean()) / s.std())
+    return delta, rangos, z
+
+
+def etapas(archivos, cache_dir):
+    # La caché se llena una vez fuera de la medición para medir también el arranque en caliente
+    df = cc.cargar_datos(archivos, cache_dir=cache_dir)
+    indice = cc.construir_indice(df)
+    panel = construir_panel(df)
+    similares = construir_indice_similares(df)
+    consultas = list(similares.filas_pais)[:100]
+    return {
+        "cargar_datos_csv": lambda: cc.cargar_datos(archivos, usar_cache=False),
+        "cargar_datos_cache": lambda: cc.cargar_datos(archivos, cache_dir=cache_dir),
+        "analizar_factores": lambda: cc.analizar_factores(df, mostrar=False),
+        "importancia_factores": lambda: cc.importancia_factores(df, semilla=0),
+        "tendencias_por_pais": lambda: cc.calcular_tendencias_paises(df),
+        "analizar_tendencias": lambda: cc.analizar_tendencias(df, mostrar=False),
+        "corrupcion_cuartiles": lambda: cc.agrupar_corrupcion(df),
+        "intervalos_anio_region": lambda: resumir_por_intervalos(df, por=["Year", "Region"], nivel=0.95),
+        "mostrar_top_paises": lambda: cc.mostrar_top_paises(df),
+        "top_indice_precalculado": lambda: (indice.top(10), indice.mayores_cambios(10)),
+        "similares_indice": lambda: construir_indice_similares(df),
+        "similares_100_consultas": lambda: [similares.vecinos(p, k=5, entre_anios=True) for p in consultas],
+        "entre_anios_groupby": lambda: entre_anios_groupby(df),
+        "panel_desde_largo": lambda: construir_panel(df),
+        "entre_anios_panel": lambda: (panel.deltas("Happiness"), panel.rangos("Happiness"),
+                                      panel.normalizar_por_anio()),
+    }
+
+
+def ejecutar(tamanos, repeticiones, semilla=0):
+    resultados = []
+    for filas in tamanos:
+        tmp = tempfile.mkdtemp(prefix="bench_felicidad_")
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                archivos = generar_dataset(os.path.join(tmp, "csv"), filas, semilla=semilla)
+                lista = etapas(archivos, os.path.join(tmp, "cache"))
+            for nombre, funcion in lista.items():
+                medicion = medir(funcion, repeticiones)
+                resultados.append({"etapa": nombre, "filas": filas, **medicion})
+                print(f"{nombre:<26} {filas:>10,} filas  {medicion['tiempo_s']*1000:10.1f} ms"
+                      f"  {medicion['memoria_pico_mb']:9.1f} MB")
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return resultados
+
+
+def comparar(actual, base):
+    previos = {(r["etapa"], r["filas"]): r for r in base["resultados"]}
+    print(f"\nComparación contra {base.get('commit')}:")
+    for r in actual["resultados"]:
+        p = previos.get((r["etapa"], r["filas"]))
+        if p:
+            print(f"{r['etapa']:<26} {r['filas']:>10,} filas  tiempo x{r['tiempo_s'] / p['tiempo_s']:.2f}"
+                  f"  memoria x{r['memoria_pico_mb'] / max(p['memoria_pico_mb'], 1e-9):.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mide tiempo y memoria de las etapas del análisis.")
+    parser.add_argument("--tamanos", default=",".join(map(str, TAMANOS)),
+                        help="Filas totales separadas por comas (p. ej. 1000,10000000)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--salida", default=None, help="Archivo JSON (por defecto benchmarks/resultados/<commit>.json)")
+    parser.add_argument("--comparar", default=None, help="JSON de una corrida anterior")
+    args = parser.parse_args()
+
+    commit = commit_actual()
+    reporte = {
+        "commit": commit,
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "resultados": ejecutar([int(t) for t in args.tamanos.split(",")], args.repeticiones),
+    }
+
+    salida = args.salida or os.path.join(BASE_DIR, "benchmarks", "resultados", f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, indent=2)
+    print(f"\n📊 Resultados en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(reporte, json.load(f))
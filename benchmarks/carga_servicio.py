@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import subprocess
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# -----------------------------------------------------------
+# Prueba de carga del servicio HTTP (src/servicio.py)
+# -----------------------------------------------------------
+# Abre `--conexiones` conexiones keep-alive contra localhost y reparte entre
+# ellas `--peticiones` GET sobre una mezcla de endpoints. Reporta latencia
+# p50/p99 y peticiones por segundo. Con --iniciar levanta el servicio en un
+# subproceso y lo detiene al terminar:
+#   python benchmarks/carga_servicio.py --iniciar --peticiones 20000 --conexiones 32
+
+RUTAS = [
+    "/pais/Finland?anio=2018",
+    "/pais/Denmark",
+    "/ranking?anio=2016&region=Western%20Europe&k=10",
+    "/ranking?k=20",
+    "/cambios?k=10",
+    "/cambios?desde=2015&hasta=2019&k=10&bajadas=1",
+    "/correlaciones?anio=2018",
+    "/correlaciones?region=Latin%20America%20and%20Caribbean",
+    "/cuartiles?factor=Corruption&anio=2019",
+    "/cuartiles?factor=GDP",
+]
+
+
+async def _leer_respuesta(reader):
+    estado = int((await reader.readline()).split()[1])
+    largo = 0
+    while True:
+        linea = await reader.readline()
+        if linea in (b"\r\n", b""):
+            break
+        nombre, _, valor = linea.decode("latin-1").partition(":")
+        if nombre.lower() == "content-length":
+            largo = int(valor)
+    await reader.readexactly(largo)
+    return estado
+
+
+async def _cliente(host, puerto, rutas, latencias, errores):
+    reader, writer = await asyncio.open_connection(host, puerto)
+    try:
+        for ruta in rutas:
+            inicio = time.perf_counter()
+            writer.write(f"GET {ruta} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+            await writer.drain()
+            estado = await _leer_respuesta(reader)
+            latencias.append(time.perf_counter() - inicio)
+            if estado != 200:
+                errores.append((ruta, estado))
+    finally:
+        writer.close()
+
+
+async def cargar(host, puerto, peticiones, conexiones, semilla=0):
+    rng = np.random.default_rng(semilla)
+    mezcla = [RUTAS[i] for i in rng.integers(0, len(RUTAS), peticiones)]
+    latencias, errores = [], []
+    inicio = time.perf_counter()
+    await asyncio.gather(*[_cliente(host, puerto, mezcla[k::conexiones], latencias, errores)
+                           for k in range(conexiones)])
+    total = time.perf_counter() - inicio
+    return np.array(latencias), errores, total
+
+
+async def esperar_servicio(host, puerto, limite=120.0):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        try:
+            reader, writer = await asyncio.open_connection(host, puerto)
+            writer.write(b"GET /salud HTTP/1.1\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            await _leer_respuesta(reader)
+            writer.close()
+            return True
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+            await asyncio.sleep(0.2)
+    return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga del servicio HTTP local.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--peticiones", type=int, default=10_000)
+    parser.add_argument("--conexiones", type=int, default=16)
+    parser.add_argument("--iniciar", action="store_true", help="Levanta el servicio en un subproceso")
+    args = parser.parse_args()
+
+    proceso = None
+    if args.iniciar:
+        proceso = subprocess.Popen([sys.executable, os.path.join(BASE_DIR, "src", "cli.py"), "servir",
+                                    "--host", args.host, "--puerto", str(args.puerto)])
+    try:
+        if not asyncio.run(esperar_servicio(args.host, args.puerto)):
+            sys.exit(f"❌ El servicio no responde en {args.host}:{args.puerto}")
+        # Una pasada de calentamiento llena la caché de respuestas
+        asyncio.run(cargar(args.host, args.puerto, len(RUTAS) * 4, 1))
+        latencias, errores, total = asyncio.run(
+            cargar(args.host, args.puerto, args.peticiones, args.conexiones))
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait()
+
+    p50, p99 = np.percentile(latencias * 1000, [50, 99])
+    print(f"\n📊 {len(latencias):,} peticiones con {args.conexiones} conexiones en {total:.2f} s")
+    print(f"   {len(latencias) / total:,.0f} peticiones/s   p50 {p50:.2f} ms   p99 {p99:.2f} ms")
+    if errores:
+        print(f"⚠️ {len(errores)} respuestas con error, p. ej. {errores[:3]}")
@@ -0,0 +1,84 @@
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from esquemas import ESQUEMAS
+
+# -----------------------------------------------------------
+# Generador de datasets sintéticos con el esquema de cada año
+# -----------------------------------------------------------
+# Escribe un CSV por año con exactamente los encabezados del registro de
+# esquemas (esquemas.ESQUEMAS), de modo que cargar_datos los procese igual
+# que a los archivos reales. Los factores se generan correlacionados con la
+# felicidad para que las correlaciones y los cuartiles tengan sentido.
+
+# Coeficiente aproximado de cada factor con la felicidad y su escala
+PERFIL_FACTORES = {
+    "GDP": (0.8, 1.6),
+    "SocialSupport": (0.65, 1.6),
+    "LifeExpectancy": (0.75, 1.0),
+    "Freedom": (0.55, 0.65),
+    "Corruption": (0.4, 0.5),
+    "Generosity": (0.15, 0.6),
+}
+
+REGIONES = [
+    "Western Europe", "North America", "Australia and New Zealand", "Middle East and Northern Africa",
+    "Latin America and Caribbean", "Southeastern Asia", "Central and Eastern Europe", "Eastern Asia",
+    "Sub-Saharan Africa", "Southern Asia",
+]
+
+
+def esquema_de_anio(year):
+    for esquema in ESQUEMAS.values():
+        if year in esquema["anios"]:
+            return esquema
+    raise ValueError(f"No hay esquema registrado para {year}")
+
+
+def generar_anio(year, filas, rng, n_paises=None):
+    esquema = esquema_de_anio(year)
+    n_paises = n_paises or max(1, min(filas, 200))
+
+    felicidad = np.clip(rng.normal(5.4, 1.1, filas), 2.5, 7.9)
+    z = (felicidad - 5.4) / 1.1
+    canonico = {
+        "Country": np.char.add("Country_", (rng.integers(0, n_paises, filas)).astype(str)),
+        "Happiness": felicidad.round(3),
+    }
+    for factor, (rho, escala) in PERFIL_FACTORES.items():
+        ruido = rng.normal(0, 1, filas)
+        valor = (rho * z + np.sqrt(1 - rho ** 2) * ruido) * escala / 4 + escala / 2
+        canonico[factor] = np.clip(valor, 0, None).round(5)
+    canonico["Region"] = np.array(REGIONES)[rng.integers(0, len(REGIONES), filas)]
+
+    columnas = dict(esquema["columnas"])
+    columnas.update(esquema.get("opcionales", {}))
+    return pd.DataFrame({src: canonico[dst] for src, dst in columnas.items()})
+
+
+def generar_dataset(salida, filas, anios=(2015, 2016, 2017, 2018, 2019), semilla=0):
+    # Reparte `filas` entre los años y devuelve {nombre: ruta} como descargar_dataset
+    os.makedirs(salida, exist_ok=True)
+    rng = np.random.default_rng(semilla)
+    por_anio = np.full(len(anios), filas // len(anios))
+    por_anio[: filas % len(anios)] += 1
+
+    archivos = {}
+    for year, n in zip(anios, por_anio):
+        path = os.path.join(salida, f"{year}.csv")
+        generar_anio(year, int(n), rng, n_paises=max(1, int(n) // 5)).to_csv(path, index=False)
+        archivos[str(year)] = path
+    return archivos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera CSV sintéticos con el esquema de cada año.")
+    parser.add_argument("salida", help="Carpeta donde escribir los CSV")
+    parser.add_argument("--filas", type=int, default=100_000, help="Filas totales (repartidas entre años)")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+    print(generar_dataset(args.salida, args.filas, semilla=args.semilla))
@@ -0,0 +1,197 @@
+import os
+import json
+import shutil
+import zipfile
+from collections import namedtuple
+import pandas as pd
+from cache_datos import calcular_sha256
+from instrumentacion import etapa, medido
+
+# -----------------------------------------------------------
+# Almacén local de datasets direccionado por contenido
+# -----------------------------------------------------------
+# Los archivos ZIP se registran por su sha256 en data/almacen/:
+#   data/almacen/objetos/<sha256>.zip   → copia inmutable del archivo
+#   data/almacen/registro.json          → nombre del archivo → sha256
+# La fuente es un directorio espejo local (variable HAPPINESS_ESPEJO o el
+# propio data/). Kaggle solo se usa si el archivo no está en ningún lado y
+# no se pidió modo offline (HAPPINESS_OFFLINE=1).
+
+ARCHIVO_DATASET = "world-happiness.zip"
+
+
+def directorio_almacen(work_dir):
+    return os.path.join(work_dir, "almacen")
+
+
+def modo_offline():
+    return os.environ.get("HAPPINESS_OFFLINE", "").lower() in ("1", "true", "si", "sí")
+
+
+def _leer_registro(almacen_dir):
+    try:
+        with open(os.path.join(almacen_dir, "registro.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _escribir_registro(almacen_dir, registro):
+    tmp = os.path.join(almacen_dir, "registro.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(registro, f, indent=2)
+    os.replace(tmp, os.path.join(almacen_dir, "registro.json"))
+
+
+def ruta_objeto(almacen_dir, sha256):
+    return os.path.join(almacen_dir, "objetos", f"{sha256}.zip")
+
+
+def registrar_archivo(path, almacen_dir, nombre=None):
+    nombre = nombre or os.path.basename(path)
+    sha256 = calcular_sha256(path)
+    destino = ruta_objeto(almacen_dir, sha256)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+
+    if not os.path.exists(destino):
+        tmp = f"{destino}.tmp"
+        # Un enlace duro evita duplicar bytes cuando el espejo está en el mismo disco
+        try:
+            os.link(path, tmp)
+        except OSError:
+            shutil.copy2(path, tmp)
+        os.replace(tmp, destino)
+
+    registro = _leer_registro(almacen_dir)
+    registro[nombre] = {"sha256": sha256, "tamaño": os.path.getsize(destino), "origen": os.path.abspath(path)}
+    _escribir_registro(almacen_dir, registro)
+    return destino, sha256
+
+
+def buscar_en_almacen(nombre, almacen_dir):
+    # Devuelve (ruta, sha256) si el archivo está registrado y su contenido es íntegro
+    entrada = _leer_registro(almacen_dir).get(nombre)
+    if not entrada:
+        return None
+    path = ruta_objeto(almacen_dir, entrada["sha256"])
+    if not os.path.exists(path) or os.path.getsize(path) != entrada.get("tamaño"):
+        return None
+    if calcular_sha256(path) != entrada["sha256"]:
+        print(f"⚠️ El objeto {os.path.basename(path)} está corrupto, se descarta.")
+        os.remove(path)
+        return None
+    return path, entrada["sha256"]
+
+
+def directorios_espejo(work_dir, espejo=None):
+    dirs = [espejo or os.environ.get("HAPPINESS_ESPEJO"), work_dir]
+    return [d for d in dirs if d and os.path.isdir(d)]
+
+
+@medido()
+def obtener_dataset(work_dir, descargar=None, espejo=None, nombre=ARCHIVO_DATASET):
+    # descargar(work_dir) es la función de respaldo que trae el ZIP desde la red
+    almacen_dir = directorio_almacen(work_dir)
+
+    encontrado = buscar_en_almacen(nombre, almacen_dir)
+    if encontrado:
+        print(f"📦 Dataset verificado en el almacén local ({encontrado[1][:12]})")
+        return encontrado
+
+    for d in directorios_espejo(work_dir, espejo):
+        candidato = os.path.join(d, nombre)
+        if os.path.isfile(candidato):
+            print(f"📦 Registrando {nombre} desde el espejo local '{d}'")
+            return registrar_archivo(candidato, almacen_dir, nombre)
+
+    if descargar is None or modo_offline():
+        raise FileNotFoundError(
+            f"No se encontró '{nombre}' en el almacén ni en el espejo local y la descarga está desactivada.")
+
+    descargar(work_dir)
+    candidato = os.path.join(work_dir, nombre)
+    if not os.path.isfile(candidato):
+        raise FileNotFoundError("No se encontró ningún archivo ZIP descargado.")
+    return registrar_archivo(candidato, almacen_dir, nombre)
+
+
+@medido("extraccion")
+def extraer_si_cambia(zip_path, sha256, dest_path):
+    # La extracción se omite si dest_path ya contiene los CSV de este mismo archivo
+    marca = os.path.join(dest_path, ".extraido.json")
+    try:
+        with open(marca, encoding="utf-8") as f:
+            previo = json.load(f)
+    except (OSError, ValueError):
+        previo = {}
+
+    if previo.get("sha256") == sha256 and all(
+            os.path.exists(os.path.join(dest_path, f)) for f in previo.get("archivos", [])):
+        return previo["archivos"]
+
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        zip_ref.extractall(dest_path)
+        archivos = [n for n in zip_ref.namelist() if n.endswith(".csv")]
+
+    with open(marca, "w", encoding="utf-8") as f:
+        json.dump({"sha256": sha256, "archivos": archivos}, f, indent=2)
+    print(f"Archivos extraídos en '{dest_path}'")
+    return archivos
+
+
+# -----------------------------------------------------------
+# Lectura directa de los CSV dentro del ZIP (sin extraer a disco)
+# -----------------------------------------------------------
+
+class MiembroZip(namedtuple("MiembroZip", ["zip_path", "miembro"])):
+    __slots__ = ()
+
+    def _info(self):
+        with zipfile.ZipFile(self.zip_path) as z:
+            return z.getinfo(self.miembro)
+
+    # Huella tomada del directorio central del ZIP: no descomprime nada
+    def huella(self):
+        info = self._info()
+        return {"mtime": "%04d-%02d-%02dT%02d:%02d:%02d" % info.date_time, "size": info.file_size}
+
+    def hash_contenido(self):
+        return f"crc32:{self._info().CRC:08x}"
+
+    def __str__(self):
+        return f"{self.zip_path}!{self.miembro}"
+
+
+def anio_de_nombre(nombre):
+    return int("".join([c for c in os.path.basename(nombre) if c.isdigit()]) or 0)
+
+
+def archivos_en_zip(zip_path, anios=None):
+    # Devuelve {nombre: MiembroZip} con los CSV del archivo, opcionalmente filtrados por año
+    with zipfile.ZipFile(zip_path) as z:
+        miembros = [n for n in z.namelist() if n.endswith(".csv")]
+    if anios is not None:
+        anios = set(anios)
+        miembros = [n for n in miembros if anio_de_nombre(n) in anios]
+    return {os.path.basename(n).split(".")[0]: MiembroZip(zip_path, n) for n in miembros}
+
+
+def leer_csv(origen, **kwargs):
+    # Acepta una ruta normal o un MiembroZip; el miembro se descomprime en streaming hacia el parser
+    with etapa("read_csv", origen=origen, solo_encabezado=kwargs.get("nrows") == 0):
+        if isinstance(origen, MiembroZip):
+            with zipfile.ZipFile(origen.zip_path) as z, z.open(origen.miembro) as f:
+                return pd.read_csv(f, **kwargs)
+        return pd.read_csv(origen, **kwargs)
+
+
+def leer_csv_por_bloques(origen, filas, **kwargs):
+    # Como leer_csv, pero entrega DataFrames de hasta `filas` filas; el archivo
+    # (o el miembro del ZIP) queda abierto mientras se recorren los bloques
+    if isinstance(origen, MiembroZip):
+        with zipfile.ZipFile(origen.zip_path) as z, z.open(origen.miembro) as f:
+            with pd.read_csv(f, chunksize=filas, **kwargs) as lector:
+                yield from lector
+    else:
+        with pd.read_csv(origen, chunksize=filas, **kwargs) as lector:
+            yield from lector
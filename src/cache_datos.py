@@ -0,0 +1,149 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+from instrumentacion import etapa
+
+# -----------------------------------------------------------
+# Caché columnar en disco de los datos normalizados por año
+# -----------------------------------------------------------
+# Cada año se guarda en su propia carpeta (data/.cache/<año>/) con un archivo
+# .npy por columna y un manifest.json con la huella (hash + mtime + tamaño)
+# del CSV de origen. El origen puede ser una ruta o un miembro de un ZIP
+# (ver almacen_datos.MiembroZip), que aporta su propia huella. Si un CSV
+# cambia solo se reconstruye ese año, y en los arranques en caliente las
+# columnas se abren con memory-map sin volver a parsear ningún CSV.
+
+# Subir este número cuando cambie la forma de normalizar los datos
+VERSION_CACHE = 3
+
+
+def directorio_cache():
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_dir, "data", ".cache")
+
+
+def calcular_sha256(path, bloque=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(bloque), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _leer_manifest(carpeta):
+    try:
+        with open(os.path.join(carpeta, "manifest.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _escribir_manifest(carpeta, manifest):
+    tmp = os.path.join(carpeta, "manifest.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(carpeta, "manifest.json"))
+
+
+def _huella(origen):
+    if hasattr(origen, "huella"):
+        return origen.huella()
+    st = os.stat(origen)
+    return {"mtime": st.st_mtime_ns, "size": st.st_size}
+
+
+def hash_contenido(origen):
+    if hasattr(origen, "hash_contenido"):
+        return origen.hash_contenido()
+    return calcular_sha256(origen)
+
+
+def _validar_cache(origen, carpeta, manifest, version):
+    # Devuelve True si la caché sigue siendo válida para el CSV indicado.
+    # Primero se compara mtime y tamaño (barato); si solo cambió el mtime se
+    # recalcula el hash y, si el contenido es el mismo, se actualiza el manifest.
+    if manifest is None or manifest.get("version") != VERSION_CACHE:
+        return False
+    if manifest.get("version_datos") != version:
+        return False
+
+    huella = _huella(origen)
+    if huella["size"] != manifest.get("size"):
+        return False
+    if huella["mtime"] == manifest.get("mtime"):
+        return True
+
+    if hash_contenido(origen) != manifest.get("hash"):
+        return False
+    manifest["mtime"] = huella["mtime"]
+    _escribir_manifest(carpeta, manifest)
+    return True
+
+
+def _guardar(carpeta, df, origen, version):
+    tmp = f"{carpeta}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    columnas = []
+    for col in df.columns:
+        serie = df[col]
+        if pd.api.types.is_numeric_dtype(serie.dtype):
+            arr = serie.to_numpy()
+            tipo = "numerico"
+        else:
+            # Los nulos se guardan como cadena vacía y vuelven a ser NaN al leer
+            arr = serie.astype(object).where(serie.notna(), "").astype(str).to_numpy(dtype=str)
+            tipo = "texto"
+        np.save(os.path.join(tmp, f"{col}.npy"), arr, allow_pickle=False)
+        columnas.append({"nombre": col, "tipo": tipo})
+
+    manifest = {
+        "version": VERSION_CACHE,
+        "version_datos": version,
+        "origen": str(origen),
+        "hash": hash_contenido(origen),
+        **_huella(origen),
+        "columnas": columnas,
+    }
+    _escribir_manifest(tmp, manifest)
+
+    shutil.rmtree(carpeta, ignore_errors=True)
+    os.replace(tmp, carpeta)
+
+
+def _leer_columnas(carpeta, manifest):
+    datos = {}
+    for info in manifest["columnas"]:
+        arr = np.load(os.path.join(carpeta, f"{info['nombre']}.npy"), mmap_mode="r")
+        if info["tipo"] == "texto":
+            arr = arr.astype(object)
+            arr[arr == ""] = None
+        datos[info["nombre"]] = arr
+    return pd.DataFrame(datos, copy=False)
+
+
+def cargar_anio_cacheado(origen, year, construir, cache_dir=None, version=None):
+    # construir(origen, year) debe devolver el DataFrame ya normalizado;
+    # version identifica el código de normalización (p. ej. el registro de esquemas)
+    cache_dir = cache_dir or directorio_cache()
+    carpeta = os.path.join(cache_dir, str(year))
+    os.makedirs(cache_dir, exist_ok=True)
+
+    manifest = _leer_manifest(carpeta)
+    if _validar_cache(origen, carpeta, manifest, version):
+        with etapa("leer_cache", anio=year):
+            return _leer_columnas(carpeta, manifest)
+
+    df = construir(origen, year)
+    with etapa("escribir_cache", anio=year):
+        _guardar(carpeta, df, origen, version)
+    print(f"💾 Caché reconstruida para {year}")
+    return df
+
+
+def limpiar_cache(cache_dir=None):
+    shutil.rmtree(cache_dir or directorio_cache(), ignore_errors=True)
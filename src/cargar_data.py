@@ -1,52 +1,94 @@
 import glob
+import argparse
 import pandas as pd
 import matplotlib.pyplot as plt
 
-#ruta donde se encuentran los archivos csv, 
+#modo por bloques: python src/cargar_data.py --bloques 100000
+#lee cada archivo de a bloques con la normalización de columnas compartida
+#(esquemas.py) y acumula el mismo reporte sin cargar todo en memoria (resumen.py)
+parser = argparse.ArgumentParser(description="Exploración de los CSV del World Happiness Report")
+parser.add_argument("--archivos", default="data/*.csv", help="Patrón de los CSV a explorar")
+parser.add_argument("--bloques", type=int, default=0, help="Filas por bloque (0 = cargar todo en memoria)")
+parser.add_argument("--muestra", type=int, default=10_000, help="Valores guardados por columna para los cuantiles")
+args = parser.parse_args()
+
+#ruta donde se encuentran los archivos csv,
 #importante, a la hora de clonar el proyecto que este sea la raíz de la carpeta
-filenames = glob.glob("data/*.csv")
-
-archivos_csv = []
-#se carga cada archivo csv y se almacena en la lista [archivos_csv]
-for filename in filenames:
-    try:
-        data = pd.read_csv(filename)
-        archivos_csv.append(data)
-        print(f"Archivo cargado correctamente: {filename}")
-    except Exception as e:
-        print(f"Error al cargar: {filename} por: {e}")
-        
-#se concatena todos los dataframes en uno solo para una mejor manipulación
-big_frame = pd.concat(archivos_csv, ignore_index=True)
-
-print(f"\nTotal de archivos procesados: {len(archivos_csv)}")
-
-#se muestra la información del dataframe
-print("\nInfo del dataframe: ")
-info = big_frame.info()
-
-print("\nResumen estadístico: ")
-describe = big_frame.describe() #muestra un resumen estadístico
-print(describe)
-
-forma = big_frame.shape #describe la forma o dimensiones del dataframe
-print(f"\nForma del dataframe: {forma}")
-    
-print("\nTipos de datos: ")
-tipos_datos = big_frame.dtypes
-print(tipos_datos)
-
-print("\nValores nulos del dataframe: ")
-valores_nulos = big_frame.isnull().sum()
-print(valores_nulos)
-
-print("\nPrimeras 10 filas del dataset: ")
-filas = big_frame.head(10)
-print(filas)
+filenames = glob.glob(args.archivos)
+
+if args.bloques:
+    from resumen import resumir_archivos
+    resumen, resultados = resumir_archivos(filenames, filas=args.bloques, muestra=args.muestra)
+    for filename, e in resultados:
+        if e is None:
+            print(f"Archivo cargado correctamente: {filename}")
+        else:
+            print(f"Error al cargar: {filename} por: {e}")
+
+    print(f"\nTotal de archivos procesados: {sum(e is None for _, e in resultados)}")
+
+    print("\nInfo del dataframe: ")
+    print(resumen.info())
+
+    print("\nResumen estadístico: ")
+    print(resumen.describe())
+
+    print(f"\nForma del dataframe: {(resumen.filas, len(resumen.columnas))}")
+
+    print("\nTipos de datos: ")
+    print(resumen.dtypes())
+
+    print("\nValores nulos del dataframe: ")
+    print(resumen.isnull_sum())
+
+    print("\nPrimeras 10 filas del dataset: ")
+    print(resumen.primeras)
+
+    conteo_regiones = resumen.value_counts("Region")
+else:
+    archivos_csv = []
+    #se carga cada archivo csv y se almacena en la lista [archivos_csv]
+    for filename in filenames:
+        try:
+            data = pd.read_csv(filename)
+            archivos_csv.append(data)
+            print(f"Archivo cargado correctamente: {filename}")
+        except Exception as e:
+            print(f"Error al cargar: {filename} por: {e}")
+
+    #se concatena todos los dataframes en uno solo para una mejor manipulación
+    big_frame = pd.concat(archivos_csv, ignore_index=True)
+
+    print(f"\nTotal de archivos procesados: {len(archivos_csv)}")
+
+    #se muestra la información del dataframe
+    print("\nInfo del dataframe: ")
+    info = big_frame.info()
+
+    print("\nResumen estadístico: ")
+    describe = big_frame.describe() #muestra un resumen estadístico
+    print(describe)
+
+    forma = big_frame.shape #describe la forma o dimensiones del dataframe
+    print(f"\nForma del dataframe: {forma}")
+
+    print("\nTipos de datos: ")
+    tipos_datos = big_frame.dtypes
+    print(tipos_datos)
+
+    print("\nValores nulos del dataframe: ")
+    valores_nulos = big_frame.isnull().sum()
+    print(valores_nulos)
+
+    print("\nPrimeras 10 filas del dataset: ")
+    filas = big_frame.head(10)
+    print(filas)
+
+    conteo_regiones = big_frame['Region'].value_counts() if 'Region' in big_frame.columns else pd.Series(dtype=int)
 
 #se visualiza por medio de una gráfica usando matplotlib la cantidad de países por región
-if 'Region' in big_frame.columns:
-    big_frame['Region'].value_counts().plot(kind='bar')
+if len(conteo_regiones):
+    conteo_regiones.plot(kind='bar')
     plt.title("Cantidad de paises por región")
     plt.xlabel("Región")
     plt.ylabel("Cantidad")
@@ -0,0 +1,307 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+# -----------------------------------------------------------
+# Línea de comandos con arranque rápido
+# -----------------------------------------------------------
+# Este módulo solo importa la librería estándar. pandas se carga al leer los
+# datos y matplotlib, plotly y scipy únicamente en los subcomandos que los
+# usan, así que `top` o `--help` no pagan el costo de los backends gráficos.
+#
+#   python src/cli.py top -n 10
+#   python src/cli.py corrupcion --remuestras 5000 --semilla 1 --sin-ventanas
+#   python src/cli.py --profile-imports top
+#   python src/cli.py --trazar trazas/todo --sin-ventanas todo
+
+# Paquetes pesados que se reportan aparte, estén donde estén en el árbol de imports
+PESADOS = ("pandas", "numpy", "matplotlib", "plotly", "scipy", "pyarrow")
+
+
+def entero_positivo(valor):
+    numero = int(valor)
+    if numero < 1:
+        raise argparse.ArgumentTypeError(f"debe ser al menos 1 (se pidió {numero})")
+    return numero
+
+
+def cargar(args):
+    import codigo_completo as cc
+    work_dir, dest_path = cc.preparar_directorios()
+    dict_files = cc.descargar_dataset(work_dir, dest_path, extraer=False, anios=args.anios)
+    return cc, cc.cargar_datos(dict_files, usar_cache=not args.sin_cache)
+
+
+def cmd_top(args):
+    cc, df = cargar(args)
+    indice = cc.construir_indice(df)
+    cc.mostrar_top_paises(df, n=args.n, year=args.anio, region=args.region, indice=indice)
+    if args.cambios:
+        try:
+            subidas = indice.mayores_cambios(args.cambios, hasta=args.anio)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        print("\n📈 Mayores subidas:\n", subidas.to_string(index=False))
+        print("\n📉 Mayores bajadas:\n",
+              indice.mayores_cambios(args.cambios, hasta=args.anio, bajadas=True).to_string(index=False))
+
+
+def cmd_factores(args):
+    cc, df = cargar(args)
+    cc.analizar_factores(df, mostrar=not args.sin_ventanas)
+
+
+def cmd_importancia(args):
+    cc, df = cargar(args)
+    tabla = cc.analizar_importancia(df, alpha=args.alpha, folds=args.folds, repeticiones=args.repeticiones,
+                                    semilla=args.semilla, procesos=args.procesos)
+    if args.salida:
+        tabla.to_csv(args.salida, index=False)
+        print(f"📄 Tabla completa en {args.salida}")
+
+
+def cmd_tendencias(args):
+    if args.sin_cache:
+        cc, df = cargar(args)
+        por_pais = None
+    else:
+        # Datos y tendencias por país salen del pipeline memoizado: con los
+        # mismos CSV se leen de data/.cache/etapas/ sin recalcular
+        import codigo_completo as cc
+        import pipeline
+        work_dir, dest_path = cc.preparar_directorios()
+        dict_files = cc.descargar_dataset(work_dir, dest_path, extraer=False, anios=args.anios)
+        resultados = pipeline.Pipeline(pipeline.etapas_analisis(dict_files)).ejecutar(["datos", "tendencias_pais"])
+        df, por_pais = resultados["datos"], resultados["tendencias_pais"]
+    cc.analizar_tendencias(df, mostrar=not args.sin_ventanas, por_pais=por_pais, n=args.n)
+    if args.salida:
+        (por_pais if por_pais is not None else cc.calcular_tendencias_paises(df)).to_csv(args.salida, index=False)
+        print(f"📄 Tendencias por país en {args.salida}")
+
+
+def cmd_corrupcion(args):
+    cc, df = cargar(args)
+    cc.analizar_corrupcion(df, mostrar=not args.sin_ventanas, remuestras=args.remuestras,
+                           semilla=args.semilla, procesos=args.procesos)
+
+
+def cmd_intervalos(args):
+    import intervalos
+    _, df = cargar(args)
+    tabla = intervalos.resumir_por_intervalos(df, factores=args.factores, bins=args.bins, metodo=args.metodo,
+                                              por=args.por, nivel=args.nivel, invertir=("Corruption",))
+    print(f"\n📊 Felicidad por intervalos ({args.metodo}, {args.bins} por factor):\n", tabla.to_string(index=False))
+
+
+def cmd_mapa(args):
+    cc, df = cargar(args)
+    cc.graficar_mapa(df, mostrar=not args.sin_ventanas, animado=args.animado)
+
+
+def cmd_radar(args):
+    cc, df = cargar(args)
+    cc.graficar_radar(df, mostrar=not args.sin_ventanas)
+
+
+def cmd_reporte(args):
+    import reporte
+    _, df = cargar(args)
+    reporte.generar_reporte(df, args.salida, formatos=tuple(args.formatos.split(",")), procesos=args.procesos,
+                            por_anio=args.por_anio, por_region=args.por_region)
+
+
+def cmd_pipeline(args):
+    import codigo_completo as cc
+    import pipeline
+    work_dir, dest_path = cc.preparar_directorios()
+    dict_files = cc.descargar_dataset(work_dir, dest_path, extraer=False, anios=args.anios)
+    resultados = pipeline.ejecutar_pipeline(dict_files, objetivos=args.etapas, forzar=args.forzar,
+                                            hilos=args.hilos, n_top=args.n)
+    for nombre, valor in resultados.items():
+        print(f"\n📦 {nombre}:\n", valor)
+
+
+def cmd_similares(args):
+    import codigo_completo as cc
+    from cache_datos import hash_contenido
+    from almacen_datos import anio_de_nombre
+    from similares import indice_similares_cacheado, construir_indice_similares
+    work_dir, dest_path = cc.preparar_directorios()
+    dict_files = cc.descargar_dataset(work_dir, dest_path, extraer=False, anios=args.anios)
+    df = cc.cargar_datos(dict_files, usar_cache=not args.sin_cache)
+    if args.sin_cache:
+        indice = construir_indice_similares(df)
+    else:
+        # Solo se procesan los años nuevos o cuyo CSV cambió desde la última vez
+        huellas = {anio_de_nombre(name): hash_contenido(origen) for name, origen in dict_files.items()}
+        indice = indice_similares_cacheado(df, huellas)
+    if args.todos:
+        tabla = indice.todos_los_vecinos(args.k, year=args.anio, entre_anios=args.entre_anios)
+        if args.salida is None:
+            print(tabla.to_string(index=False))
+    elif args.pais is None:
+        print("❌ Indique un país o use --todos")
+        return 2
+    else:
+        try:
+            print("\n🧭 Perfil (factores estandarizados):\n", indice.perfil(args.pais, args.anio).round(2))
+            tabla = indice.vecinos(args.pais, year=args.anio, k=args.k, entre_anios=args.entre_anios)
+        except KeyError as e:
+            print(f"❌ {e.args[0]}")
+            return 1
+        print("\n🌎 Países con el perfil más parecido:\n", tabla.to_string(index=False))
+    if args.salida:
+        tabla.to_csv(args.salida, index=False)
+        print(f"📄 Vecinos en {args.salida}")
+
+
+def cmd_servir(args):
+    import servicio
+    _, df = cargar(args)
+    servicio.servir(df, host=args.host, puerto=args.puerto)
+
+
+def cmd_todo(args):
+    cc, df = cargar(args)
+    print("Dataset unificado con shape:", df.shape)
+    cc.ejecutar_todo(df, mostrar=not args.sin_ventanas)
+
+
+def perfilar_imports(argv, top=15):
+    # Reejecuta el mismo comando con `python -X importtime` y resume los
+    # módulos de primer nivel más costosos
+    inicio = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", os.path.abspath(__file__), *argv],
+                          stderr=subprocess.PIPE, text=True)
+    total = time.perf_counter() - inicio
+
+    acumulado = {}
+    pesados = {}
+    for linea in proc.stderr.splitlines():
+        if not linea.startswith("import time:") or "|" not in linea:
+            continue
+        _, cumulativo, nombre = linea[len("import time:"):].split("|", 2)
+        if not cumulativo.strip().isdigit():
+            continue
+        if nombre.strip() in PESADOS:
+            pesados[nombre.strip()] = int(cumulativo)
+        # Solo módulos de primer nivel (un espacio de sangría) para no contar dos veces
+        if len(nombre) - len(nombre.lstrip()) <= 1:
+            paquete = nombre.strip().split(".")[0]
+            acumulado[paquete] = acumulado.get(paquete, 0) + int(cumulativo)
+
+    print(f"\n⏱️  Tiempo total del comando: {total:.2f} s (código de salida {proc.returncode})")
+    print(f"   Importaciones: {sum(acumulado.values()) / 1e6:.2f} s")
+    for paquete, us in sorted(acumulado.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"   {paquete:<24} {us / 1e3:9.1f} ms")
+    print("   Paquetes pesados cargados: " + (", ".join(
+        f"{p} {us / 1e3:.0f} ms" for p, us in sorted(pesados.items(), key=lambda kv: -kv[1])) or "ninguno"))
+    return proc.returncode
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog="felicidad", description="Análisis del World Happiness Report.")
+    parser.add_argument("--profile-imports", action="store_true",
+                        help="Mide el costo de importación del comando (python -X importtime)")
+    parser.add_argument("--anios", type=lambda v: [int(a) for a in v.split(",")], default=None,
+                        help="Años a cargar, separados por comas (por defecto todos)")
+    parser.add_argument("--sin-cache", action="store_true", help="Ignora la caché de datos normalizados")
+    parser.add_argument("--trazar", metavar="PREFIJO", default=None,
+                        help="Registra tiempo y CPU por etapa en PREFIJO.json y PREFIJO.trace.json")
+    parser.add_argument("--trazar-memoria", action="store_true",
+                        help="Con --trazar, agrega la memoria pico por etapa (tracemalloc; encarece los tiempos)")
+    parser.add_argument("--sin-ventanas", action="store_true", help="Construye las figuras sin mostrarlas")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("top", help="Países más felices (solo texto)")
+    p.add_argument("-n", type=int, default=10)
+    p.add_argument("--anio", type=int, default=None, help="Año del ranking (por defecto el último)")
+    p.add_argument("--region", default=None)
+    p.add_argument("--cambios", type=int, default=0, help="Muestra los k países que más puestos subieron y bajaron")
+    p.set_defaults(func=cmd_top)
+
+    sub.add_parser("factores", help="Pregunta 1: factores más correlacionados").set_defaults(func=cmd_factores)
+    p = sub.add_parser("importancia", help="Importancia multivariada (OLS/ridge) por total, año y región")
+    p.add_argument("--alpha", type=float, default=1.0, help="Penalización ridge (variables estandarizadas)")
+    p.add_argument("--folds", type=int, default=5)
+    p.add_argument("--repeticiones", type=int, default=10, help="Permutaciones por factor")
+    p.add_argument("--semilla", type=int, default=None)
+    p.add_argument("--procesos", type=int, default=1)
+    p.add_argument("--salida", default=None, help="CSV con la tabla completa")
+    p.set_defaults(func=cmd_importancia)
+
+    p = sub.add_parser("tendencias", help="Pregunta 2: evolución por año y tendencia de cada país")
+    p.add_argument("-n", type=int, default=5, help="Países que más suben y más caen")
+    p.add_argument("--salida", default=None, help="CSV con la tendencia de cada país y variable")
+    p.set_defaults(func=cmd_tendencias)
+
+    p = sub.add_parser("corrupcion", help="Pregunta 3: corrupción vs felicidad")
+    p.add_argument("--remuestras", type=int, default=0, help="Bootstrap y permutaciones (0 = desactivado)")
+    p.add_argument("--semilla", type=int, default=None)
+    p.add_argument("--procesos", type=int, default=1)
+    p.set_defaults(func=cmd_corrupcion)
+
+    lista = lambda v: [e for e in v.split(",") if e]
+    p = sub.add_parser("intervalos", help="Felicidad por intervalos de cada factor (cuantiles o ancho fijo)")
+    p.add_argument("--factores", type=lista, default=None, help="Por defecto los seis factores")
+    p.add_argument("--bins", type=int, default=4)
+    p.add_argument("--metodo", choices=["cuantil", "ancho"], default="cuantil")
+    p.add_argument("--por", type=lista, default=None, help="Cortes, p. ej. Year o Year,Region")
+    p.add_argument("--nivel", type=float, default=None, help="Agrega el IC de cada media (p. ej. 0.95)")
+    p.set_defaults(func=cmd_intervalos)
+
+    p = sub.add_parser("mapa", help="Mapa de felicidad por país")
+    p.add_argument("--animado", action="store_true", help="Un frame por año")
+    p.set_defaults(func=cmd_mapa)
+
+    sub.add_parser("radar", help="Radar de factores").set_defaults(func=cmd_radar)
+
+    p = sub.add_parser("reporte", help="Renderiza todas las figuras a archivos (sin pantalla)")
+    p.add_argument("--salida", default="reporte")
+    p.add_argument("--formatos", default="png,svg,html")
+    p.add_argument("--procesos", type=int, default=None)
+    p.add_argument("--por-anio", action="store_true")
+    p.add_argument("--por-region", action="store_true")
+    p.set_defaults(func=cmd_reporte)
+
+    p = sub.add_parser("pipeline", help="Etapas con resultados memoizados (solo recalcula lo que cambió)")
+    p.add_argument("--etapas", type=lista, default=None, help="Etapas a obtener (por defecto todas)")
+    p.add_argument("--forzar", type=lista, default=[], help="Etapas a recalcular aunque estén en caché")
+    p.add_argument("--hilos", type=int, default=None)
+    p.add_argument("-n", type=int, default=10, help="Países del top")
+    p.set_defaults(func=cmd_pipeline)
+
+    p = sub.add_parser("similares", help="Países con el perfil de factores más parecido (k vecinos)")
+    p.add_argument("pais", nargs="?", default=None)
+    p.add_argument("--anio", type=int, default=None, help="Año del país consultado (por defecto el último)")
+    p.add_argument("-k", type=entero_positivo, default=5)
+    p.add_argument("--entre-anios", action="store_true", help="Compara contra las filas de todos los años")
+    p.add_argument("--todos", action="store_true", help="Vecinos de todos los países (del año pedido o de todos)")
+    p.add_argument("--salida", default=None, help="CSV con los vecinos")
+    p.set_defaults(func=cmd_similares)
+
+    p = sub.add_parser("servir", help="Servicio HTTP JSON con los datos en memoria")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--puerto", type=int, default=8765)
+    p.set_defaults(func=cmd_servir)
+
+    sub.add_parser("todo", help="Ejecuta todo el análisis").set_defaults(func=cmd_todo)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = crear_parser().parse_args(argv)
+    if args.profile_imports:
+        return perfilar_imports([a for a in argv if a != "--profile-imports"])
+    if args.trazar:
+        import instrumentacion
+        instrumentacion.activar(args.trazar, memoria=args.trazar_memoria)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,23 @@
 import os
-import zipfile
 import subprocess
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import plotly.express as px
-import plotly.graph_objects as go
+from cache_datos import cargar_anio_cacheado
+from almacen_datos import obtener_dataset, extraer_si_cambia, archivos_en_zip
+from correlaciones import construir_motor, valor_p_pearson
+from remuestreo import bootstrap_pearson, permutacion_pearson, bootstrap_medias
+from mapas import figura_mapa_animada
+from paises import canonizar_paises
+from rankings import construir_indice
+from importancia import importancia_factores
+from tendencias import tendencias_por_pais
+from panel import Panel, construir_panel
+from intervalos import asignar_intervalos, resumir_por_intervalos, ETIQUETAS_CUARTILES
+from instrumentacion import etapa, medido
+from esquemas import VERSION_REGISTRO, normalizar, leer_normalizado, tipar, completar_regiones, ordenar_columnas
+
+# matplotlib y plotly se importan dentro de las funciones que grafican, así
+# las consultas de solo texto (p. ej. mostrar_top_paises) arrancan rápido.
 
 # -----------------------------------------------------------
 # 0. Descarga y carga del dataset desde Kaggle
@@ -21,7 +33,8 @@ def preparar_directorios():
     return work_dir, dest_path
 
 
-def descargar_dataset(work_dir, dest_path):
+@medido("descarga_kaggle")
+def descargar_kaggle(work_dir):
     print("Descargando dataset desde Kaggle...")
 
     # Ejecutar descarga con subprocess (más seguro que os.system)
@@ -35,18 +48,26 @@ def descargar_dataset(work_dir, dest_path):
         print("❌ Error en la descarga:", result.stderr)
         raise RuntimeError("La descarga con Kaggle falló. Verifica que kaggle esté instalado y autenticado.")
 
-    # Buscar el archivo ZIP descargado
-    zip_files = [f for f in os.listdir(work_dir) if f.endswith(".zip")]
-    if not zip_files:
-        raise FileNotFoundError("No se encontró ningún archivo ZIP descargado.")
 
-    zip_path = os.path.join(work_dir, zip_files[0])
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(dest_path)
+@medido()
+def descargar_dataset(work_dir, dest_path, espejo=None, extraer=True, anios=None):
+    # Primero se busca el ZIP verificado en el almacén local o en el espejo;
+    # Kaggle solo se invoca si no está disponible en ninguno de los dos
+    zip_path, sha256 = obtener_dataset(work_dir, descargar=descargar_kaggle, espejo=espejo)
+
+    # Sin extracción: cada CSV se lee en streaming desde el ZIP (solo los años pedidos)
+    if not extraer:
+        archivos = archivos_en_zip(zip_path, anios)
+        print("📂 Archivos en el ZIP:", list(archivos))
+        if not archivos:
+            raise FileNotFoundError("No se encontraron archivos CSV dentro del ZIP.")
+        return archivos
+
+    extraer_si_cambia(zip_path, sha256, dest_path)
 
     # Listar los archivos CSV extraídos
     archivos = [f for f in os.listdir(dest_path) if f.endswith(".csv")]
-    print("📂 Archivos descargados:", archivos)
+    print("📂 Archivos disponibles:", archivos)
 
     if not archivos:
         raise FileNotFoundError("No se encontraron archivos CSV en la carpeta de destino.")
@@ -55,146 +76,250 @@ def descargar_dataset(work_dir, dest_path):
 
 
 def normalizar_columnas(df, year):
-    mapping = {}
-    if year in [2015, 2016]:
-        mapping = {
-            "Country": "Country",
-            "Happiness Score": "Happiness",
-            "Economy (GDP per Capita)": "GDP",
-            "Family": "SocialSupport",
-            "Health (Life Expectancy)": "LifeExpectancy",
-            "Freedom": "Freedom",
-            "Trust (Government Corruption)": "Corruption",
-            "Generosity": "Generosity",
-        }
-    elif year == 2017:
-        mapping = {
-            "Country": "Country",
-            "Happiness.Score": "Happiness",
-            "Economy..GDP.per.Capita.": "GDP",
-            "Family": "SocialSupport",
-            "Health..Life.Expectancy.": "LifeExpectancy",
-            "Freedom": "Freedom",
-            "Trust..Government.Corruption.": "Corruption",
-            "Generosity": "Generosity",
-        }
-    elif year in [2018, 2019]:
-        mapping = {
-            "Country or region": "Country",
-            "Score": "Happiness",
-            "GDP per capita": "GDP",
-            "Social support": "SocialSupport",
-            "Healthy life expectancy": "LifeExpectancy",
-            "Freedom to make life choices": "Freedom",
-            "Perceptions of corruption": "Corruption",
-            "Generosity": "Generosity",
-        }
-    return df.rename(columns=mapping)[list(mapping.values())]
-
-
-def cargar_datos(dict_files):
+    # Los mapeos por año viven en el registro de esquemas (esquemas.py)
+    return normalizar(df, year)
+
+
+def leer_anio(path, year):
+    return leer_normalizado(path, year)
+
+
+@medido()
+def cargar_datos(dict_files, usar_cache=True, cache_dir=None):
     data = []
     for name, path in dict_files.items():
         year = int("".join([c for c in name if c.isdigit()]) or 0)
-        if 2015 <= year <= 2019:
-            df = pd.read_csv(path)
-            df_n = normalizar_columnas(df, year)
-            df_n["Year"] = year
+        if year >= 2015:
+            # La caché guarda cada año ya normalizado; solo se reconstruye si cambia su CSV
+            with etapa("cargar_anio", anio=year):
+                if usar_cache:
+                    df_n = cargar_anio_cacheado(path, year, leer_anio, cache_dir=cache_dir, version=VERSION_REGISTRO)
+                else:
+                    df_n = leer_anio(path, year)
             data.append(df_n)
     if not data:
         raise ValueError("No se pudieron cargar datos de los archivos CSV.")
-    return pd.concat(data, ignore_index=True)
+    # Tras concatenar se unifican los nombres de país (con su ISO-3), Country
+    # vuelve a ser categórica y los años sin columna Region la completan por país
+    with etapa("concat", partes=len(data)):
+        df = pd.concat(data, ignore_index=True)
+    with etapa("canonizar_paises"):
+        df = canonizar_paises(df)
+    with etapa("completar_y_tipar"):
+        return tipar(completar_regiones(df[ordenar_columnas(df.columns)]))
 
 # -----------------------------------------------------------
 # 1) Pregunta 1 – Factores principales que explican la felicidad
 # -----------------------------------------------------------
 
-def analizar_factores(df):
-    corr = df.corr(numeric_only=True)["Happiness"].drop("Happiness").sort_values(ascending=False)
+def correlaciones_factores(df, motor=None):
+    # El motor de correlaciones se puede compartir entre análisis (ver correlaciones.py)
+    motor = motor or construir_motor(df)
+    return motor.con_objetivo("Happiness").sort_values(ascending=False)
+
+
+@medido()
+def _grafico_factores(top3):
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(6,4))
+    top3.plot(kind="bar", color="skyblue", edgecolor="black", ax=ax)
+    ax.set_title("Top 3 factores más influyentes en la felicidad")
+    ax.set_ylabel("Correlación con felicidad")
+    ax.tick_params(axis="x", labelrotation=30)
+    fig.tight_layout()
+    return fig
+
+
+def figura_factores(df):
+    return _grafico_factores(correlaciones_factores(df).head(3))
+
+
+@medido()
+def analizar_factores(df, mostrar=True, motor=None):
+    import matplotlib.pyplot as plt
+    corr = correlaciones_factores(df, motor)
     print("\n🔍 Correlaciones con la felicidad:\n", corr)
 
-    top3 = corr.head(3)
-    plt.figure(figsize=(6,4))
-    top3.plot(kind="bar", color="skyblue", edgecolor="black")
-    plt.title("Top 3 factores más influyentes en la felicidad")
-    plt.ylabel("Correlación con felicidad")
-    plt.xticks(rotation=30)
-    plt.tight_layout()
-    plt.show()
-    return top3
+    fig = _grafico_factores(corr.head(3))
+    if mostrar:
+        plt.show()
+    return fig
+
+
+@medido()
+def analizar_importancia(df, alpha=1.0, folds=5, repeticiones=10, semilla=None, procesos=1):
+    # Complementa la correlación de a pares con un modelo multivariado: betas
+    # estandarizadas (OLS y ridge), importancia por permutación y R² con
+    # validación cruzada, para el total, cada año y cada región (ver importancia.py)
+    tabla = importancia_factores(df, alpha=alpha, folds=folds, repeticiones=repeticiones,
+                                 semilla=semilla, procesos=procesos)
+    total = (tabla[(tabla["corte"] == "todos") & (tabla["modelo"] == "ols")]
+             .set_index("factor")[["coef", "beta_std", "importancia_perm"]]
+             .sort_values("importancia_perm", ascending=False))
+    r2 = tabla.loc[(tabla["corte"] == "todos") & (tabla["modelo"] == "ols"), ["r2", "r2_cv"]].iloc[0]
+    print("\n🧮 Importancia multivariada (OLS, todos los años):\n", total)
+    print(f"R² = {r2['r2']:.3f}, R² con validación cruzada ({folds} pliegues) = {r2['r2_cv']:.3f}")
+    return tabla
 
 # -----------------------------------------------------------
 # 2) Pregunta 2 – Evolución de la felicidad en el tiempo
 # -----------------------------------------------------------
 
-def analizar_tendencias(df):
-    tendencia = df.groupby("Year")["Happiness"].mean().reset_index()
-    plt.figure(figsize=(6,4))
-    plt.plot(tendencia["Year"], tendencia["Happiness"], marker="o", linestyle="-", color="green")
-    plt.title("Evolución de la felicidad promedio (2015-2019)")
-    plt.xlabel("Año")
-    plt.ylabel("Felicidad promedio")
-    plt.grid(True, linestyle="--", alpha=0.6)
-    plt.tight_layout()
-    plt.show()
+def calcular_tendencia(df):
+    # Promedio por año sobre el panel país × año (ver panel.py). Acepta el
+    # DataFrame largo de cargar_datos o un Panel ya construido.
+    panel = df if isinstance(df, Panel) else construir_panel(df, ["Happiness"])
+    return panel.promedio_por_anio("Happiness").reset_index()
+
+
+@medido()
+def _grafico_tendencias(tendencia):
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(6,4))
+    ax.plot(tendencia["Year"], tendencia["Happiness"], marker="o", linestyle="-", color="green")
+    ax.set_title("Evolución de la felicidad promedio (2015-2019)")
+    ax.set_xlabel("Año")
+    ax.set_ylabel("Felicidad promedio")
+    ax.grid(True, linestyle="--", alpha=0.6)
+    fig.tight_layout()
+    return fig
+
+
+def figura_tendencias(df):
+    return _grafico_tendencias(calcular_tendencia(df))
+
+
+@medido()
+def calcular_tendencias_paises(df):
+    # Pendiente, intercepto, R² y significancia por país para la felicidad y
+    # cada factor, todos a la vez sobre el panel (ver tendencias.py)
+    return tendencias_por_pais(df)
+
+
+def mostrar_tendencias_paises(por_pais, n=5, variable="Happiness"):
+    # Países con la tendencia significativa más fuerte (en puntos por año)
+    tabla = por_pais[(por_pais["variable"] == variable) & por_pais["significativo"]]
+    columnas = [c for c in ["Country", "Region", "n", "pendiente", "r2", "p_valor"] if c in tabla.columns]
+    print(f"\n{len(tabla)} países con tendencia significativa de {variable} (p < 0.05)")
+    print("📈 Suben más:\n", tabla[tabla["pendiente"] > 0].nlargest(n, "pendiente")[columnas].to_string(index=False))
+    print("📉 Caen más:\n", tabla[tabla["pendiente"] < 0].nsmallest(n, "pendiente")[columnas].to_string(index=False))
+
+
+@medido()
+def analizar_tendencias(df, mostrar=True, por_pais=None, n=5):
+    import matplotlib.pyplot as plt
+    # Un solo panel para el promedio por año y las tendencias por país
+    panel = df if isinstance(df, Panel) else construir_panel(df)
+    tendencia = calcular_tendencia(panel)
+    fig = _grafico_tendencias(tendencia)
+    if mostrar:
+        plt.show()
     print("\nTendencia de felicidad promedio:\n", tendencia)
+    if por_pais is None:
+        por_pais = calcular_tendencias_paises(panel)
+    mostrar_tendencias_paises(por_pais, n=n)
+    return fig
 
 # -----------------------------------------------------------
 # 3) Pregunta 3 – Corrupción vs felicidad
 # -----------------------------------------------------------
 
-def analizar_corrupcion(df):
-    df["corrup_real"] = 1 - df["Corruption"]
-    df['corr_group'] = pd.qcut(
-        df['corrup_real'],
-        q=4,
-        labels=['Muy baja', 'Baja', 'Alta', 'Muy alta'],
-        duplicates='drop'
-    )
+def agrupar_corrupcion(df, por=None, nivel=None):
+    # Cuartiles de corrupción percibida (1 - Corruption) y felicidad por cuartil,
+    # con el motor de intervalos (ver intervalos.py); no modifica df
+    return resumir_por_intervalos(df, ["Corruption"], bins=4, por=por, nivel=nivel, invertir=("Corruption",))
 
-    grouped = df.groupby('corr_group')["Happiness"].agg(['mean','std','count']).reset_index()
-    print("\nPromedios de felicidad según corrupción:\n", grouped)
 
+@medido()
+def _grafico_corrupcion(grouped):
+    import matplotlib.pyplot as plt
     x = np.arange(len(grouped))
-    plt.figure(figsize=(8,5))
-    bars = plt.bar(x, grouped['mean'], color=plt.cm.viridis(np.linspace(0,1,len(grouped))))
-    plt.xticks(x, grouped['corr_group'].astype(str), fontsize=11)
-    plt.xlabel('Niveles de corrupción (cuartiles)', fontsize=12)
-    plt.ylabel('Felicidad promedio', fontsize=12)
-    plt.title('Felicidad promedio según niveles de corrupción', fontsize=14, fontweight='bold')
+    fig, ax = plt.subplots(figsize=(8,5))
+    bars = ax.bar(x, grouped['mean'], color=plt.cm.viridis(np.linspace(0,1,len(grouped))))
+    ax.set_xticks(x, grouped['grupo'].astype(str), fontsize=11)
+    ax.set_xlabel('Niveles de corrupción (cuartiles)', fontsize=12)
+    ax.set_ylabel('Felicidad promedio', fontsize=12)
+    ax.set_title('Felicidad promedio según niveles de corrupción', fontsize=14, fontweight='bold')
 
     for bar in bars:
         yval = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2, yval + 0.05, f"{yval:.2f}",
-                 ha='center', va='bottom', fontsize=10)
+        ax.text(bar.get_x() + bar.get_width()/2, yval + 0.05, f"{yval:.2f}",
+                ha='center', va='bottom', fontsize=10)
+
+    ax.set_ylim(2, 8)
+    fig.tight_layout()
+    return fig
+
 
-    plt.ylim(2, 8)
-    plt.tight_layout()
-    plt.show()
+def figura_corrupcion(df):
+    return _grafico_corrupcion(agrupar_corrupcion(df))
 
+
+@medido()
+def analizar_corrupcion(df, mostrar=True, motor=None, remuestras=0, semilla=None, procesos=1):
+    # remuestras > 0 agrega IC bootstrap de r y de cada media, y una prueba de permutación
+    import matplotlib.pyplot as plt
+    grouped = agrupar_corrupcion(df)
+    print("\nPromedios de felicidad según corrupción:\n", grouped[["grupo", "mean", "std", "count"]])
+
+    fig = _grafico_corrupcion(grouped)
+    if mostrar:
+        plt.show()
+
+    # La corrupción percibida es 1 - Corruption, así que su r es el de Corruption con el signo invertido
+    motor = motor or construir_motor(df)
+    r, n = motor.par("Corruption", "Happiness")
+    r = -r
     try:
-        from scipy.stats import pearsonr
-        r, p = pearsonr(df['corrup_real'], df["Happiness"])
+        p = valor_p_pearson(r, n)
         print(f"Correlación Pearson corrupción vs felicidad: r = {r:.3f}, p = {p:.3e}")
     except Exception:
-        r = np.corrcoef(df['corrup_real'], df["Happiness"])[0,1]
         print(f"Correlación (sin scipy) ≈ r = {r:.3f}")
 
+    if remuestras:
+        corrup_real = 1 - df["Corruption"]
+        codigos = asignar_intervalos(df, ["Corruption"], bins=4, invertir=("Corruption",))["codigos"][:, 0]
+        corr_group = pd.Categorical.from_codes(codigos, categories=ETIQUETAS_CUARTILES, ordered=True)
+        boot = bootstrap_pearson(corrup_real, df["Happiness"], remuestras, semilla=semilla, procesos=procesos)
+        perm = permutacion_pearson(corrup_real, df["Happiness"], remuestras, semilla=semilla, procesos=procesos)
+        medias = bootstrap_medias(df["Happiness"], corr_group, remuestras, semilla=semilla, procesos=procesos)
+        print(f"IC 95% bootstrap de r: [{boot['ic_inf']:.3f}, {boot['ic_sup']:.3f}] ({remuestras} remuestras)")
+        print(f"Prueba de permutación: p = {perm['p']:.2e} ({remuestras} permutaciones)")
+        print("\nIC 95% bootstrap de la felicidad promedio por cuartil:\n", medias)
+    return fig
+
 # -----------------------------------------------------------
 # 4) Pregunta 4 – Top países + mapa + radar de factores
 # -----------------------------------------------------------
 
-def mostrar_top_paises(df, n=10):
-    top_countries = df[["Country", "Happiness"]].sort_values("Happiness", ascending=False).head(n)
-    print(f"\n🌍 Top {n} países más felices:\n", top_countries)
+@medido()
+def mostrar_top_paises(df, n=10, year=None, region=None, indice=None):
+    # Un año por ranking (por defecto el último) para que un país no aparezca
+    # varias veces. El índice se puede construir una vez y reutilizar (ver rankings.py)
+    indice = indice or construir_indice(df)
+    top_countries = indice.top(n, year=year, region=region)
+    year = int(top_countries["Year"].iloc[0]) if len(top_countries) else year
+    donde = f" en {region}" if region else ""
+    print(f"\n🌍 Top {n} países más felices{donde} ({year}):\n", top_countries.to_string(index=False))
     return top_countries
 
 
-def graficar_mapa(df):
+@medido()
+def figura_mapa(df):
+    # Con ISO3 (ver paises.py) plotly no tiene que resolver nombres fila por fila.
+    # Se usa una fila por país (promedio de los años presentes) para que las
+    # filas repetidas de distintos años no se pisen entre sí.
+    import plotly.express as px
+    por_codigo = "ISO3" in df.columns
+    clave = "ISO3" if por_codigo else "Country"
+    por_pais = (df.dropna(subset=[clave])
+                  .groupby(clave, observed=True)
+                  .agg(Country=("Country", "first"), Happiness=("Happiness", "mean"))
+                  .reset_index(drop=not por_codigo))
     fig_map = px.choropleth(
-        df,
-        locations="Country",
-        locationmode="country names",
+        por_pais,
+        locations=clave,
+        locationmode="ISO-3" if por_codigo else "country names",
         color="Happiness",
         color_continuous_scale="Turbo",
         title="🌍 Índice de felicidad por país",
@@ -206,13 +331,27 @@ def graficar_mapa(df):
         title_font=dict(size=18, family="Arial", color="black"),
         coloraxis_colorbar=dict(title="Felicidad", ticks="outside")
     )
-    fig_map.show()
+    return fig_map
 
 
-def graficar_radar(df):
+@medido()
+def graficar_mapa(df, mostrar=True, animado=False):
+    # animado=True: un frame por año (ver mapas.py)
+    fig_map = figura_mapa_animada(df) if animado else figura_mapa(df)
+    if mostrar:
+        fig_map.show()
+    return fig_map
+
+
+def correlaciones_radar(df, motor=None):
     factors = [c for c in ["GDP","SocialSupport","LifeExpectancy","Freedom","Generosity"] if c in df.columns]
-    radar_data = df[factors + ["Happiness"]].corr()["Happiness"].drop("Happiness")
+    motor = motor or construir_motor(df)
+    return motor.con_objetivo("Happiness", variables=factors)
+
 
+@medido()
+def _grafico_radar(radar_data):
+    import plotly.graph_objects as go
     fig_radar = go.Figure()
     fig_radar.add_trace(go.Scatterpolar(
         r=radar_data.values,
@@ -228,32 +367,57 @@ def graficar_radar(df):
         title="📊 Factores que influyen en la felicidad",
         showlegend=False
     )
-    fig_radar.show()
+    return fig_radar
+
+
+def figura_radar(df):
+    return _grafico_radar(correlaciones_radar(df))
+
+
+@medido()
+def graficar_radar(df, mostrar=True, motor=None):
+    radar_data = correlaciones_radar(df, motor)
+    fig_radar = _grafico_radar(radar_data)
+    if mostrar:
+        fig_radar.show()
     print(f"\n✅ El factor que más influye en la felicidad es: {radar_data.abs().idxmax()}")
+    return fig_radar
 
 # -----------------------------------------------------------
 # Ejecución principal
 # -----------------------------------------------------------
-if __name__ == "__main__":
-    work_dir, dest_path = preparar_directorios()
-    dict_files = descargar_dataset(work_dir, dest_path)
-    df_all = cargar_datos(dict_files)
-
-    print("Dataset unificado con shape:", df_all.shape)
+@medido()
+def ejecutar_todo(df_all, mostrar=True):
+    # Una sola pasada sobre los datos sirve a los tres análisis de correlación,
+    # y el índice de rankings se arma una vez para todas las consultas de top
+    motor = construir_motor(df_all)
+    indice = construir_indice(df_all)
 
     # Pregunta 1
-    analizar_factores(df_all)
+    analizar_factores(df_all, mostrar=mostrar, motor=motor)
 
     # Pregunta 2
-    analizar_tendencias(df_all)
+    analizar_tendencias(df_all, mostrar=mostrar)
 
     # Pregunta 3
-    analizar_corrupcion(df_all)
+    analizar_corrupcion(df_all, mostrar=mostrar, motor=motor)
 
     # Pregunta 4
-    mostrar_top_paises(df_all)
-    graficar_mapa(df_all)
-    graficar_radar(df_all)
+    mostrar_top_paises(df_all, indice=indice)
+    if len(indice.anios) > 1:
+        print("\n📈 Países que más puestos subieron en el último año:\n",
+              indice.mayores_cambios(5).to_string(index=False))
+    graficar_mapa(df_all, mostrar=mostrar)
+    graficar_radar(df_all, mostrar=mostrar, motor=motor)
+
+
+if __name__ == "__main__":
+    work_dir, dest_path = preparar_directorios()
+    dict_files = descargar_dataset(work_dir, dest_path, extraer=False)
+    df_all = cargar_datos(dict_files)
+
+    print("Dataset unificado con shape:", df_all.shape)
+    ejecutar_todo(df_all)
 
 # -----------------------------------------------------------
 # Análisis de resultados
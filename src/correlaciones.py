@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+from esquemas import FACTORES
+
+# -----------------------------------------------------------
+# Motor de correlaciones incremental
+# -----------------------------------------------------------
+# Por cada partición (año, región) se guardan estadísticos combinables por par
+# de variables (para reproducir la eliminación por pares de df.corr()):
+# conteo, medias y co-momentos centrados. Las particiones se combinan con la
+# actualización por pares de Chan, que no sufre la cancelación de las sumas
+# de potencias (n·Σxy - Σx·Σy) cuando hay muchas filas o valores grandes.
+# Agregar un año nuevo solo procesa sus filas; cualquier corte (un año, una
+# región o el total) se obtiene combinando particiones.
+
+VARIABLES = ["Happiness"] + FACTORES
+# Como df.corr(numeric_only=True), el motor también correlaciona el año
+VARIABLES_MOTOR = VARIABLES + ["Year"]
+CLAVES = ["Year", "Region"]
+CAMPOS = ("n", "media", "m2", "cxy")
+
+
+def _valor_clave(columna, valor):
+    if valor is None or pd.isna(valor):
+        return None
+    return int(valor) if columna == "Year" else str(valor)
+
+
+class Estadisticas:
+    # Para cada par (i, j), sobre las filas con i y j presentes:
+    # n[i, j]: cantidad de filas; media[i, j]: media de i; m2[i, j]: suma de
+    # (x_i - media[i, j])²; cxy[i, j]: suma de (x_i - media[i, j])·(x_j - media[j, i])
+    def __init__(self, k):
+        self.n = np.zeros((k, k))
+        self.media = np.zeros((k, k))
+        self.m2 = np.zeros((k, k))
+        self.cxy = np.zeros((k, k))
+
+    @classmethod
+    def desde_matriz(cls, X):
+        est = cls(X.shape[1])
+        presente = ~np.isnan(X)
+        M = presente.astype(np.float64)
+        # Se desplaza cada columna por su media antes de sumar: las sumas de
+        # potencias de datos desplazados no pierden precisión
+        cuenta = presente.sum(axis=0)
+        desplazamiento = np.where(presente, X, 0.0).sum(axis=0) / np.maximum(cuenta, 1)
+        Y = np.where(presente, X - desplazamiento, 0.0)
+        est.n = M.T @ M
+        with np.errstate(invalid="ignore", divide="ignore"):
+            media_y = np.where(est.n > 0, (Y.T @ M) / est.n, 0.0)
+        est.media = media_y + desplazamiento[:, None]
+        est.m2 = np.maximum((Y * Y).T @ M - est.n * media_y ** 2, 0.0)
+        est.cxy = Y.T @ Y - est.n * media_y * media_y.T
+        return est
+
+    def __add__(self, otra):
+        res = Estadisticas(self.n.shape[0])
+        res.n = self.n + otra.n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            peso = np.where(res.n > 0, self.n * otra.n / res.n, 0.0)
+            fraccion = np.where(res.n > 0, otra.n / res.n, 0.0)
+        delta = otra.media - self.media
+        res.media = self.media + delta * fraccion
+        res.m2 = self.m2 + otra.m2 + delta ** 2 * peso
+        res.cxy = self.cxy + otra.cxy + delta * delta.T * peso
+        return res
+
+    def correlacion(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            r = self.cxy / np.sqrt(self.m2 * self.m2.T)
+        r[self.n < 2] = np.nan
+        np.fill_diagonal(r, np.where(np.diag(self.n) >= 2, 1.0, np.nan))
+        return np.clip(r, -1.0, 1.0)
+
+
+class MotorCorrelaciones:
+    def __init__(self, variables=VARIABLES_MOTOR, claves=CLAVES):
+        self.variables = list(variables)
+        self.claves = list(claves)
+        self.particiones = {}
+
+    def agregar(self, df):
+        # Acumula las filas nuevas en sus particiones sin tocar las existentes
+        presentes = [c for c in self.claves if c in df.columns]
+        # Una variable ausente (p. ej. un DataFrame sin Year) cuenta como faltante
+        X = df.reindex(columns=self.variables).to_numpy(dtype=np.float64)
+        if not presentes:
+            self._acumular(tuple(None for _ in self.claves), X)
+            return self
+
+        grupos = df.groupby(presentes, observed=True, dropna=False, sort=False).indices
+        for clave, idx in grupos.items():
+            valores = dict(zip(presentes, clave if isinstance(clave, tuple) else (clave,)))
+            self._acumular(tuple(_valor_clave(c, valores.get(c)) for c in self.claves), X[idx])
+        return self
+
+    def _acumular(self, clave, X):
+        est = Estadisticas.desde_matriz(X)
+        previa = self.particiones.get(clave)
+        self.particiones[clave] = est if previa is None else previa + est
+
+    def estadisticas(self, **filtro):
+        # filtro: Year=2018, Region="Western Europe", o ambos; sin filtro = total
+        posiciones = {c: i for i, c in enumerate(self.claves)}
+        total = Estadisticas(len(self.variables))
+        for clave, est in self.particiones.items():
+            if all(clave[posiciones[c]] == v for c, v in filtro.items() if c in posiciones):
+                total = total + est
+        return total
+
+    def matriz(self, **filtro):
+        r = self.estadisticas(**filtro).correlacion()
+        return pd.DataFrame(r, index=self.variables, columns=self.variables)
+
+    def con_objetivo(self, objetivo="Happiness", variables=None, **filtro):
+        serie = self.matriz(**filtro)[objetivo].drop(objetivo)
+        return serie if variables is None else serie[[v for v in variables if v in serie.index]]
+
+    def par(self, a, b, **filtro):
+        # Devuelve (r, n) para un par de variables
+        est = self.estadisticas(**filtro)
+        i, j = self.variables.index(a), self.variables.index(b)
+        return float(est.correlacion()[i, j]), int(est.n[i, j])
+
+    def guardar(self, path):
+        datos = {"variables": np.array(self.variables), "claves": np.array(self.claves)}
+        for k, (clave, est) in enumerate(self.particiones.items()):
+            datos[f"p{k}_clave"] = np.array(["" if v is None else str(v) for v in clave])
+            for campo in CAMPOS:
+                datos[f"p{k}_{campo}"] = getattr(est, campo)
+        np.savez(path, **datos)
+
+    @classmethod
+    def cargar(cls, path):
+        datos = np.load(path)
+        motor = cls(datos["variables"].tolist(), datos["claves"].tolist())
+        k = 0
+        while f"p{k}_clave" in datos:
+            clave = tuple(_valor_clave(c, v or None) for c, v in zip(motor.claves, datos[f"p{k}_clave"].tolist()))
+            est = Estadisticas(len(motor.variables))
+            for campo in CAMPOS:
+                setattr(est, campo, datos[f"p{k}_{campo}"])
+            motor.particiones[clave] = est
+            k += 1
+        return motor
+
+
+def construir_motor(df):
+    return MotorCorrelaciones().agregar(df)
+
+
+def valor_p_pearson(r, n):
+    # Valor p bilateral de la prueba t para r de Pearson (requiere scipy)
+    from scipy.stats import t
+    if n < 3 or not np.isfinite(r):
+        return np.nan
+    r = min(abs(r), 1.0 - 1e-15)
+    estadistico = r * np.sqrt((n - 2) / (1 - r * r))
+    return float(2 * t.sf(estadistico, n - 2))
@@ -0,0 +1,157 @@
+import numpy as np
+from almacen_datos import leer_csv, leer_csv_por_bloques
+from instrumentacion import etapa, medido
+
+# -----------------------------------------------------------
+# Registro de esquemas de los CSV del World Happiness Report
+# -----------------------------------------------------------
+# Cada entrada traduce el encabezado de un formato de archivo a los nombres
+# canónicos. El esquema se detecta a partir de la fila de encabezado, así que
+# un archivo nuevo (2020+) solo necesita su entrada aquí. El parseo lee
+# únicamente las columnas necesarias y con tipos compactos.
+
+# Subir cuando cambie cualquier esquema (invalida la caché de datos)
+VERSION_REGISTRO = 2
+
+COLUMNAS_CANONICAS = [
+    "Country", "Happiness", "GDP", "SocialSupport",
+    "LifeExpectancy", "Freedom", "Corruption", "Generosity",
+]
+FACTORES = COLUMNAS_CANONICAS[2:]
+
+TIPOS_CANONICOS = {c: "float32" for c in COLUMNAS_CANONICAS[1:]}
+TIPOS_CANONICOS["Country"] = "category"
+TIPOS_CANONICOS["Region"] = "category"
+TIPOS_CANONICOS["ISO3"] = "category"
+TIPO_ANIO = np.int16
+
+ESQUEMAS = {
+    "whr-2015/v1": {
+        "anios": [2015, 2016],
+        "columnas": {
+            "Country": "Country",
+            "Happiness Score": "Happiness",
+            "Economy (GDP per Capita)": "GDP",
+            "Family": "SocialSupport",
+            "Health (Life Expectancy)": "LifeExpectancy",
+            "Freedom": "Freedom",
+            "Trust (Government Corruption)": "Corruption",
+            "Generosity": "Generosity",
+        },
+        # Columnas que se conservan si aparecen, pero no definen el esquema
+        "opcionales": {"Region": "Region"},
+    },
+    "whr-2017/v1": {
+        "anios": [2017],
+        "columnas": {
+            "Country": "Country",
+            "Happiness.Score": "Happiness",
+            "Economy..GDP.per.Capita.": "GDP",
+            "Family": "SocialSupport",
+            "Health..Life.Expectancy.": "LifeExpectancy",
+            "Freedom": "Freedom",
+            "Trust..Government.Corruption.": "Corruption",
+            "Generosity": "Generosity",
+        },
+    },
+    "whr-2018/v1": {
+        "anios": [2018, 2019],
+        "columnas": {
+            "Country or region": "Country",
+            "Score": "Happiness",
+            "GDP per capita": "GDP",
+            "Social support": "SocialSupport",
+            "Healthy life expectancy": "LifeExpectancy",
+            "Freedom to make life choices": "Freedom",
+            "Perceptions of corruption": "Corruption",
+            "Generosity": "Generosity",
+        },
+    },
+}
+
+
+def detectar_esquema(columnas):
+    # Devuelve el id del esquema cuyas columnas de origen están todas en el encabezado
+    columnas = set(columnas)
+    for esquema_id, esquema in ESQUEMAS.items():
+        if set(esquema["columnas"]) <= columnas:
+            return esquema_id
+    raise ValueError(f"Encabezado no reconocido por ningún esquema: {sorted(columnas)}")
+
+
+def esquema_por_anio(year):
+    for esquema_id, esquema in ESQUEMAS.items():
+        if year in esquema["anios"]:
+            return esquema_id
+    return None
+
+
+def ordenar_columnas(columnas):
+    orden = COLUMNAS_CANONICAS + ["ISO3", "Region", "Year"]
+    return [c for c in orden if c in columnas] + [c for c in columnas if c not in orden]
+
+
+def completar_regiones(df):
+    # Solo 2015 y 2016 traen la región; el resto de años la toma por país
+    if "Region" not in df.columns:
+        return df
+    conocidas = df.dropna(subset=["Region"]).drop_duplicates("Country", keep="last")
+    mapa = dict(zip(conocidas["Country"].astype(str), conocidas["Region"].astype(str)))
+    faltantes = df["Region"].isna()
+    if faltantes.any():
+        df = df.copy()
+        region = df["Region"].astype(object)
+        region[faltantes] = df.loc[faltantes, "Country"].astype(str).map(mapa)
+        df["Region"] = region
+    return df
+
+
+def tipar(df):
+    # Aplica los tipos compactos canónicos a las columnas presentes
+    tipos = {c: t for c, t in TIPOS_CANONICOS.items() if c in df.columns and df[c].dtype != t}
+    if "Year" in df.columns and df["Year"].dtype != TIPO_ANIO:
+        tipos["Year"] = TIPO_ANIO
+    return df.astype(tipos) if tipos else df
+
+
+@medido("normalizar_columnas")
+def normalizar(df, year=None):
+    # Renombra un DataFrame ya leído; el año solo se usa si el encabezado no se reconoce
+    try:
+        esquema_id = detectar_esquema(df.columns)
+    except ValueError:
+        esquema_id = esquema_por_anio(year)
+        if esquema_id is None:
+            raise
+    mapping = ESQUEMAS[esquema_id]["columnas"]
+    return tipar(df.rename(columns=mapping)[list(mapping.values())])
+
+
+def _mapeo(origen):
+    # Solo se lee el encabezado para detectar el esquema; devuelve el mapeo de
+    # columnas (incluidas las opcionales presentes) y sus tipos finales
+    encabezado = leer_csv(origen, nrows=0).columns
+    esquema = ESQUEMAS[detectar_esquema(encabezado)]
+    mapping = dict(esquema["columnas"])
+    mapping.update({src: dst for src, dst in esquema.get("opcionales", {}).items() if src in encabezado})
+    return mapping, {src: TIPOS_CANONICOS[dst] for src, dst in mapping.items()}
+
+
+def leer_normalizado(origen, year):
+    # Se parsean únicamente las columnas del mapeo con sus tipos finales
+    mapping, tipos = _mapeo(origen)
+    df = leer_csv(origen, usecols=list(mapping), dtype=tipos)
+    with etapa("normalizar_columnas", anio=year):
+        df = df.rename(columns=mapping)[list(mapping.values())]
+        df["Year"] = TIPO_ANIO(year)
+    return df
+
+
+def leer_normalizado_por_bloques(origen, year, filas=100_000):
+    # Igual que leer_normalizado, de a `filas` filas para archivos que no
+    # entran en memoria. Las categorías de cada bloque son solo las que aparecen en él.
+    mapping, tipos = _mapeo(origen)
+    for bloque in leer_csv_por_bloques(origen, filas, usecols=list(mapping), dtype=tipos):
+        bloque = bloque.rename(columns=mapping)[list(mapping.values())]
+        bloque["Year"] = TIPO_ANIO(year)
+        yield bloque
@@ -1,9 +1,10 @@
 import os
-import zipfile
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
+from cache_datos import cargar_anio_cacheado
+from almacen_datos import obtener_dataset, extraer_si_cambia, archivos_en_zip
+from correlaciones import construir_motor
+from paises import canonizar_paises
+from esquemas import VERSION_REGISTRO, normalizar, leer_normalizado, tipar, completar_regiones, ordenar_columnas
 
 # 1. Descarga y carga del dataset desde Kaggle
 
@@ -17,32 +18,25 @@ def preparar_directorios():
     return work_dir, dest_path
 
 
-def descargar_dataset(work_dir, dest_path):
+def descargar_kaggle(work_dir):
     print("Descargando dataset desde Kaggle...")
 
     # Ruta completa de kaggle.exe
     kaggle_path = r"C:\Users\Usuario\AppData\Local\Programs\Python\Python313\Scripts\kaggle.exe"
 
-    # Ejecutar descarga usando la ruta completa
-    os.system(f'"{kaggle_path}" datasets download -d unsdsn/world-happiness -p "{work_dir}" --unzip')
+    # Ejecutar descarga usando la ruta completa (sin --unzip: el ZIP se registra en el almacén)
+    os.system(f'"{kaggle_path}" datasets download -d unsdsn/world-happiness -p "{work_dir}"')
 
-    # Verificar archivos descargados
-    downloaded_files = [f for f in os.listdir(work_dir) if f.startswith("world-happiness")]
-    if not downloaded_files:
-        raise FileNotFoundError("No se encontró el dataset descargado en Kaggle.")
 
-    dataset_file = os.path.join(work_dir, downloaded_files[0])
+def descargar_dataset(work_dir, dest_path, espejo=None, extraer=True, anios=None):
+    # ZIP verificado por sha256 desde el almacén local / espejo; Kaggle solo como respaldo
+    zip_path, sha256 = obtener_dataset(work_dir, descargar=descargar_kaggle, espejo=espejo)
 
-    # Extraer archivos ZIP (si queda alguno)
-    if dataset_file.endswith(".zip"):
-        with zipfile.ZipFile(dataset_file, 'r') as zip_ref:
-            zip_ref.extractall(dest_path)
-        print(f"Archivos extraídos en '{dest_path}'")
-    elif dataset_file.endswith(".csv"):
-        new_path = os.path.join(dest_path, os.path.basename(dataset_file))
-        if not os.path.exists(new_path):
-            os.rename(dataset_file, new_path)
-        print(f"Archivo CSV movido a '{dest_path}'")
+    # Lectura directa desde el ZIP, sin escribir los CSV en disco
+    if not extraer:
+        return archivos_en_zip(zip_path, anios)
+
+    extraer_si_cambia(zip_path, sha256, dest_path)
 
     # Archivos CSV por año
     files = [f for f in os.listdir(dest_path) if f.endswith(".csv")]
@@ -51,100 +45,82 @@ def descargar_dataset(work_dir, dest_path):
 # 2. Columnas para todos los años
 
 def normalizar_columnas(df, year):
-    mapping = {}
-    if year in [2015, 2016]:
-        mapping = {
-            "Country": "Country",
-            "Happiness Score": "Happiness",
-            "Economy (GDP per Capita)": "GDP",
-            "Family": "SocialSupport",
-            "Health (Life Expectancy)": "LifeExpectancy",
-            "Freedom": "Freedom",
-            "Trust (Government Corruption)": "Corruption",
-            "Generosity": "Generosity",
-        }
-    elif year == 2017:
-        mapping = {
-            "Country": "Country",
-            "Happiness.Score": "Happiness",
-            "Economy..GDP.per.Capita.": "GDP",
-            "Family": "SocialSupport",
-            "Health..Life.Expectancy.": "LifeExpectancy",
-            "Freedom": "Freedom",
-            "Trust..Government.Corruption.": "Corruption",
-            "Generosity": "Generosity",
-        }
-    elif year in [2018, 2019]:
-        mapping = {
-            "Country or region": "Country",
-            "Score": "Happiness",
-            "GDP per capita": "GDP",
-            "Social support": "SocialSupport",
-            "Healthy life expectancy": "LifeExpectancy",
-            "Freedom to make life choices": "Freedom",
-            "Perceptions of corruption": "Corruption",
-            "Generosity": "Generosity",
-        }
-    return df.rename(columns=mapping)[list(mapping.values())]
-
-
-def cargar_datos(dict_files):
+    # Los mapeos por año viven en el registro de esquemas (esquemas.py)
+    return normalizar(df, year)
+
+
+def leer_anio(path, year):
+    return leer_normalizado(path, year)
+
+
+def cargar_datos(dict_files, usar_cache=True):
     data = []
     for name, path in dict_files.items():
         year = int("".join([c for c in name if c.isdigit()]) or 0)
-        if year >= 2015 and year <= 2019:
-            df = pd.read_csv(path)
-            df_n = normalizar_columnas(df, year)
-            df_n["Year"] = year
+        if year >= 2015:
+            # Se reutiliza la caché columnar por año (ver cache_datos.py)
+            if usar_cache:
+                df_n = cargar_anio_cacheado(path, year, leer_anio, version=VERSION_REGISTRO)
+            else:
+                df_n = leer_anio(path, year)
             data.append(df_n)
-    return pd.concat(data, ignore_index=True)
+    # Tras concatenar se unifican los nombres de país (con su ISO-3), Country
+    # vuelve a ser categórica y los años sin columna Region la completan por país
+    df = canonizar_paises(pd.concat(data, ignore_index=True))
+    return tipar(completar_regiones(df[ordenar_columnas(df.columns)]))
 
 
 # 3. Pregunta 1 – Factores principales que explican la felicidad
 
-def analizar_factores(df):
-    corr = df.corr(numeric_only=True)["Happiness"].drop("Happiness").sort_values(ascending=False)
+def analizar_factores(df, mostrar=True, motor=None):
+    # Correlaciones desde el motor de estadísticos suficientes (correlaciones.py)
+    import matplotlib.pyplot as plt
+    motor = motor or construir_motor(df)
+    corr = motor.con_objetivo("Happiness").sort_values(ascending=False)
     print("\n🔍 Correlaciones con la felicidad:\n", corr)
 
     # Top 3 factores
     top3 = corr.head(3)
-    plt.figure(figsize=(6,4))
-    top3.plot(kind="bar", color="skyblue", edgecolor="black")
-    plt.title("Top 3 factores más influyentes en la felicidad")
-    plt.ylabel("Correlación con felicidad")
-    plt.xticks(rotation=30)
-    plt.tight_layout()
-    plt.show()
-
-    return top3
+    fig, ax = plt.subplots(figsize=(6,4))
+    top3.plot(kind="bar", color="skyblue", edgecolor="black", ax=ax)
+    ax.set_title("Top 3 factores más influyentes en la felicidad")
+    ax.set_ylabel("Correlación con felicidad")
+    ax.tick_params(axis="x", labelrotation=30)
+    fig.tight_layout()
+    if mostrar:
+        plt.show()
+    return fig
 
 
 # 4. Pregunta 2 – Evolución de la felicidad a lo largo del tiempo
 
-def analizar_tendencias(df):
+def analizar_tendencias(df, mostrar=True):
+    import matplotlib.pyplot as plt
     tendencia = df.groupby("Year")["Happiness"].mean().reset_index()
-    plt.figure(figsize=(6,4))
-    plt.plot(tendencia["Year"], tendencia["Happiness"], marker="o", linestyle="-", color="green")
-    plt.title("Evolución de la felicidad promedio (2015-2019)")
-    plt.xlabel("Año")
-    plt.ylabel("Felicidad promedio")
-    plt.grid(True, linestyle="--", alpha=0.6)
-    plt.tight_layout()
-    plt.show()
+    fig, ax = plt.subplots(figsize=(6,4))
+    ax.plot(tendencia["Year"], tendencia["Happiness"], marker="o", linestyle="-", color="green")
+    ax.set_title("Evolución de la felicidad promedio (2015-2019)")
+    ax.set_xlabel("Año")
+    ax.set_ylabel("Felicidad promedio")
+    ax.grid(True, linestyle="--", alpha=0.6)
+    fig.tight_layout()
+    if mostrar:
+        plt.show()
     print("\nTendencia de felicidad promedio:\n", tendencia)
+    return fig
 
 
 # 5. Ejecución
 
 if __name__ == "__main__":
     work_dir, dest_path = preparar_directorios()
-    dict_files = descargar_dataset(work_dir, dest_path)
+    dict_files = descargar_dataset(work_dir, dest_path, extraer=False)
     df_all = cargar_datos(dict_files)
 
     print("Dataset unificado con shape:", df_all.shape)
 
     # Pregunta 1
-    top3 = analizar_factores(df_all)
+    analizar_factores(df_all)
 
     # Pregunta 2
     analizar_tendencias(df_all)
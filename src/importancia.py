@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from esquemas import FACTORES
+
+# -----------------------------------------------------------
+# Importancia multivariada de los factores (OLS y ridge)
+# -----------------------------------------------------------
+# La correlación de a pares no separa factores que se mueven juntos (PIB,
+# esperanza de vida y apoyo social). Aquí se ajusta felicidad ~ factores
+# para el total, cada año y cada región a la vez:
+#   - Cada corte se resume en estadísticos suficientes (n, sumas y productos
+#     cruzados) con np.bincount, sin recorrer los cortes en Python. Las sumas
+#     se arman con los datos centrados en la media de su corte, así que
+#     cruz - n·media·mediaᵀ (y la resta total - pliegue de la validación
+#     cruzada) no pierden precisión cuando las variables están lejos de cero.
+#   - Los coeficientes salen de un único np.linalg.solve por lotes sobre las
+#     matrices de correlación de todos los cortes (ridge penaliza los
+#     coeficientes estandarizados; OLS es alpha = 0).
+#   - La validación cruzada K-fold usa que los estadísticos se suman: el
+#     entrenamiento de cada pliegue es total - pliegue, así que los S·K
+#     ajustes también son un solo solve por lotes.
+#   - La importancia por permutación es la caída de R² al permutar cada
+#     factor dentro de su corte (promedio de `repeticiones`).
+# Las familias de cortes (total, Year, Region) y los modelos se reparten entre
+# procesos con procesos > 1. Se usan las filas con todos los valores presentes.
+
+FAMILIAS = ("todos", "Year", "Region")
+
+
+def _familia(df, familia):
+    # Código de corte por fila (-1 = fuera de todo corte) y etiqueta de cada corte
+    if familia == "todos":
+        return np.zeros(len(df), dtype=np.int64), ["todos"]
+    codigos, etiquetas = pd.factorize(df[familia], sort=True)
+    return codigos.astype(np.int64), [e.item() if hasattr(e, "item") else e for e in etiquetas]
+
+
+def _centro(Z, ids, S):
+    # Media de cada corte (NaN en los cortes vacíos)
+    n = np.bincount(ids, minlength=S)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.stack([np.bincount(ids, weights=Z[:, i], minlength=S) for i in range(Z.shape[1])], axis=1) / n[:, None]
+
+
+def _sumas(Z, ids, S):
+    # n (S,), suma (S, q) y productos cruzados (S, q, q) por corte
+    q = Z.shape[1]
+    n = np.bincount(ids, minlength=S).astype(np.float64)
+    suma = np.stack([np.bincount(ids, weights=Z[:, i], minlength=S) for i in range(q)], axis=1)
+    cruz = np.empty((S, q, q))
+    for i in range(q):
+        for j in range(i, q):
+            cruz[:, i, j] = cruz[:, j, i] = np.bincount(ids, weights=Z[:, i] * Z[:, j], minlength=S)
+    return n, suma, cruz
+
+
+def _ajustar(n, suma, cruz, alpha, centro):
+    # Ridge sobre variables estandarizadas dentro de cada corte, para todos los cortes a la vez.
+    # La última columna de Z es el objetivo; las sumas son de Z - centro.
+    p = suma.shape[1] - 1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = suma / n[:, None]
+        cov = (cruz - n[:, None, None] * media[:, :, None] * media[:, None, :]) / (n - 1)[:, None, None]
+        sd = np.sqrt(np.clip(np.diagonal(cov, axis1=1, axis2=2), 0, None))
+        R = cov / (sd[:, :, None] * sd[:, None, :])
+    Rxx, rxy = R[:, :p, :p], R[:, :p, p]
+
+    validos = (n > p + 1) & np.isfinite(R).all(axis=(1, 2))
+    beta = np.full((len(n), p), np.nan)
+    if validos.any():
+        A = (n[validos] - 1)[:, None, None] * Rxx[validos] + alpha * np.eye(p)
+        b = (n[validos] - 1)[:, None] * rxy[validos]
+        beta[validos] = np.linalg.solve(A, b[:, :, None])[:, :, 0]
+
+    coef = beta * sd[:, p:] / sd[:, :p]
+    original = media + centro
+    intercepto = original[:, p] - np.nansum(coef * original[:, :p], axis=1)
+    # R² dentro de la muestra con estadísticos suficientes: 1 - SSE/SST estandarizados
+    r2 = 2 * np.einsum("sp,sp->s", beta, rxy) - np.einsum("sp,spq,sq->s", beta, Rxx, beta)
+    return {"beta": beta, "coef": coef, "intercepto": intercepto, "r2": r2}
+
+
+def _predecir(X, ids, ajuste):
+    return ajuste["intercepto"][ids] + np.einsum("np,np->n", X, ajuste["coef"][ids])
+
+
+def _agrupados_al_azar(ids, rng):
+    # Orden de filas agrupado por corte y al azar dentro de cada corte
+    return np.lexsort((rng.random(len(ids)), ids))
+
+
+def _importancia_permutacion(X, y, ids, S, ajuste, repeticiones, rng):
+    # Caída de R² al permutar cada factor dentro de su corte
+    residuo = y - _predecir(X, ids, ajuste)
+    n = np.bincount(ids, minlength=S)
+    media_y = np.bincount(ids, weights=y, minlength=S) / n
+    sst = np.bincount(ids, weights=(y - media_y[ids]) ** 2, minlength=S)
+    sse = np.bincount(ids, weights=residuo ** 2, minlength=S)
+
+    base = np.argsort(ids, kind="stable")
+    caida = np.zeros((S, X.shape[1]))
+    for _ in range(repeticiones):
+        pareja = np.empty(len(ids), dtype=np.intp)
+        pareja[base] = _agrupados_al_azar(ids, rng)
+        for j in range(X.shape[1]):
+            cambio = ajuste["coef"][ids, j] * (X[pareja, j] - X[:, j])
+            sse_perm = np.bincount(ids, weights=(residuo - cambio) ** 2, minlength=S)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                caida[:, j] += (sse_perm - sse) / sst
+    return caida / repeticiones
+
+
+def _validacion_cruzada(Z, ids, S, alpha, folds, rng):
+    # R² fuera de la muestra con K pliegues asignados al azar dentro de cada corte
+    orden = _agrupados_al_azar(ids, rng)
+    inicio = np.searchsorted(ids[orden], np.arange(S))
+    pliegue = np.empty(len(ids), dtype=np.int64)
+    pliegue[orden] = (np.arange(len(ids)) - inicio[ids[orden]]) % folds
+
+    # Todos los pliegues de un corte se centran en la media del corte completo
+    centro = _centro(Z, ids, S)
+    Zc = Z - centro[ids]
+    total = _sumas(Zc, ids, S)
+    por_pliegue = _sumas(Zc, ids * folds + pliegue, S * folds)
+    entrenamiento = [np.repeat(t, folds, axis=0) - f for t, f in zip(total, por_pliegue)]
+    ajuste = _ajustar(*entrenamiento, alpha, np.repeat(centro, folds, axis=0))
+
+    X, y = Z[:, :-1], Z[:, -1]
+    residuo = y - _predecir(X, ids * folds + pliegue, ajuste)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sst = np.bincount(ids, weights=(y - centro[ids, -1]) ** 2, minlength=S)
+        return 1 - np.bincount(ids, weights=residuo ** 2, minlength=S) / sst
+
+
+def _analizar_familia(familia, Z, ids, etiquetas, factores, modelo, alpha, folds, repeticiones, semilla):
+    rng = np.random.default_rng(semilla)
+    dentro = ids >= 0
+    Z, ids = Z[dentro], ids[dentro]
+    S = len(etiquetas)
+    centro = _centro(Z, ids, S)
+    ajuste = _ajustar(*_sumas(Z - centro[ids], ids, S), alpha, centro)
+    importancia = _importancia_permutacion(Z[:, :-1], Z[:, -1], ids, S, ajuste, repeticiones, rng)
+    r2_cv = _validacion_cruzada(Z, ids, S, alpha, folds, rng) if folds > 1 else np.full(S, np.nan)
+    n = np.bincount(ids, minlength=S)
+
+    s_idx, f_idx = np.divmod(np.arange(S * len(factores)), len(factores))
+    return pd.DataFrame({
+        "corte": familia,
+        "valor": [etiquetas[s] for s in s_idx],
+        "modelo": modelo,
+        "factor": np.array(factores, dtype=object)[f_idx],
+        "coef": ajuste["coef"][s_idx, f_idx],
+        "beta_std": ajuste["beta"][s_idx, f_idx],
+        "importancia_perm": importancia[s_idx, f_idx],
+        "r2": ajuste["r2"][s_idx],
+        "r2_cv": r2_cv[s_idx],
+        "n": n[s_idx],
+    })
+
+
+def importancia_factores(df, factores=None, objetivo="Happiness", alpha=1.0, folds=5, repeticiones=10,
+                         familias=FAMILIAS, semilla=None, procesos=1):
+    # Tabla ordenada: una fila por (corte, valor, modelo, factor)
+    factores = [f for f in (factores or FACTORES) if f in df.columns]
+    completas = df.dropna(subset=factores + [objetivo])
+    Z = completas[factores + [objetivo]].to_numpy(dtype=np.float64)
+    modelos = {"ols": 0.0, "ridge": float(alpha)}
+
+    familias = [f for f in familias if f == "todos" or f in df.columns]
+    tareas = []
+    semillas = np.random.SeedSequence(semilla).spawn(len(familias) * len(modelos))
+    for familia in familias:
+        ids, etiquetas = _familia(completas, familia)
+        for modelo, a in modelos.items():
+            tareas.append((familia, Z, ids, etiquetas, factores, modelo, a, folds, repeticiones,
+                           semillas[len(tareas)]))
+
+    if procesos == 1:
+        partes = [_analizar_familia(*t) for t in tareas]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            partes = list(pool.map(_analizar_familia, *zip(*tareas)))
+    return pd.concat(partes, ignore_index=True)
@@ -0,0 +1,256 @@
+import os
+import json
+import time
+import atexit
+import functools
+import threading
+import contextlib
+import tracemalloc
+
+# -----------------------------------------------------------
+# Instrumentación opcional de etapas (tiempo, CPU y memoria)
+# -----------------------------------------------------------
+# Desactivada por defecto: etapa() devuelve un contexto nulo compartido y los
+# decoradores @medido solo consultan un booleano antes de llamar a la función.
+# Se activa con la variable de entorno HAPPINESS_TRAZA=<prefijo> (o "1" para
+# el prefijo "traza") o con `python src/cli.py --trazar <prefijo> ...`. Por
+# cada etapa se registra tiempo de reloj y tiempo de CPU del hilo que la corre
+# (thread_time: las etapas que corren a la vez en hilos del pipeline no se
+# cargan el CPU de las otras; el trabajo de hilos internos de numpy o de
+# procesos hijos no entra), y al salir se escriben <prefijo>.json y
+# <prefijo>.trace.json; este último se abre en chrome://tracing o
+# https://ui.perfetto.dev. Las etapas que se solaparon con otra de otro hilo
+# quedan marcadas con "concurrente".
+#
+# La memoria pico por etapa (tracemalloc, que también ve numpy) se pide aparte
+# con HAPPINESS_TRAZA_MEMORIA=1 o --trazar-memoria: tracemalloc intercepta
+# cada asignación y encarece las etapas, así que los tiempos de esa corrida no
+# sirven para comparar. El pico es del proceso y reset_peak() es global: si
+# una etapa se solapa con otra de otro hilo (pipeline con varios hilos), su
+# pico no se registra (queda en null).
+#
+# Los procesos hijos no escriben traza propia. Una tarea que corre en un pool
+# se envuelve con con_eventos(): en el hijo registra sus etapas y las devuelve
+# junto con el resultado, y el padre las suma con incorporar() bajo el pid del
+# hijo (así se trazan los renders del reporte en paralelo). El remuestreo en
+# procesos no se traza por dentro.
+
+VARIABLE_ENTORNO = "HAPPINESS_TRAZA"
+VARIABLE_MEMORIA = "HAPPINESS_TRAZA_MEMORIA"
+
+_activa = False
+_prefijo = None
+_pid = None
+_inicio = 0.0
+_eventos = []
+_bloqueo = threading.Lock()
+_local = threading.local()
+# Etapas abiertas en cada hilo, para detectar solapamientos entre hilos
+_abiertas = {}
+_NULO = contextlib.nullcontext()
+
+
+def activa():
+    return _activa
+
+
+def activar(prefijo="traza", memoria=False):
+    global _activa, _prefijo, _pid, _inicio
+    if _activa:
+        return
+    _activa, _prefijo, _pid = True, prefijo, os.getpid()
+    _inicio = time.perf_counter()
+    # Los procesos hijos heredan el entorno; así saben que no les toca escribir
+    # y alinean sus tiempos con el inicio del padre
+    os.environ[VARIABLE_ENTORNO] = prefijo
+    os.environ[f"{VARIABLE_ENTORNO}_PID"] = str(_pid)
+    os.environ[f"{VARIABLE_ENTORNO}_INICIO"] = repr(time.time())
+    if memoria:
+        os.environ[VARIABLE_MEMORIA] = "1"
+    if memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    atexit.register(escribir_traza)
+
+
+class _Etapa:
+    __slots__ = ("nombre", "args", "inicio", "cpu", "memoria", "pico_hijos", "solapada")
+
+    def __init__(self, nombre, args):
+        self.nombre = nombre
+        self.args = args
+
+    def __enter__(self):
+        pila = getattr(_local, "pila", None)
+        if pila is None:
+            pila = _local.pila = []
+        hilo = threading.get_ident()
+        self.memoria = None
+        self.pico_hijos = 0
+        with _bloqueo:
+            otras = [e for h, etapas in _abiertas.items() if h != hilo for e in etapas]
+            # Con otra etapa en curso en otro hilo ningún pico es atribuible:
+            # se marcan ambas y no se toca reset_peak()
+            self.solapada = bool(otras)
+            for e in otras:
+                e.solapada = True
+            if tracemalloc.is_tracing() and not self.solapada:
+                actual, pico = tracemalloc.get_traced_memory()
+                # El pico acumulado hasta ahora se le guarda a la etapa que contiene a esta
+                if pila:
+                    pila[-1].pico_hijos = max(pila[-1].pico_hijos, pico)
+                tracemalloc.reset_peak()
+                self.memoria = actual
+            _abiertas.setdefault(hilo, []).append(self)
+        pila.append(self)
+        self.cpu = time.thread_time()
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        fin = time.perf_counter()
+        cpu = time.thread_time() - self.cpu
+        pila = _local.pila
+        pila.pop()
+        pico_mb = None
+        with _bloqueo:
+            abiertas = _abiertas[threading.get_ident()]
+            abiertas.remove(self)
+            if not abiertas:
+                del _abiertas[threading.get_ident()]
+            if self.memoria is not None and not self.solapada and tracemalloc.is_tracing():
+                pico = max(tracemalloc.get_traced_memory()[1], self.pico_hijos)
+                pico_mb = (pico - self.memoria) / 2 ** 20
+                if pila:
+                    pila[-1].pico_hijos = max(pila[-1].pico_hijos, pico)
+        evento = {
+            "nombre": self.nombre,
+            "inicio_s": self.inicio - _inicio,
+            "reloj_s": fin - self.inicio,
+            "cpu_s": cpu,
+            "memoria_pico_mb": pico_mb,
+            "nivel": len(pila),
+            "concurrente": self.solapada,
+            "pid": os.getpid(),
+            "hilo": threading.get_ident(),
+            "error": tipo.__name__ if tipo else None,
+            "args": self.args,
+        }
+        with _bloqueo:
+            _eventos.append(evento)
+        return False
+
+
+def etapa(nombre, **args):
+    # with etapa("read_csv", anio=2018): ...
+    if not _activa:
+        return _NULO
+    return _Etapa(nombre, {k: str(v) for k, v in args.items()})
+
+
+def medido(nombre=None):
+    # Decorador: mide cada llamada a la función como una etapa
+    def decorar(funcion):
+        etiqueta = nombre or funcion.__name__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _activa:
+                return funcion(*args, **kwargs)
+            with _Etapa(etiqueta, {}):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorar
+
+
+def eventos():
+    with _bloqueo:
+        return list(_eventos)
+
+
+def _activar_en_hijo():
+    # En un proceso hijo de una corrida trazada: registra en memoria, sin
+    # escribir archivos al salir, con los tiempos relativos al inicio del padre
+    global _activa, _prefijo, _pid, _inicio
+    if _activa:
+        return
+    inicio_padre = float(os.environ.get(f"{VARIABLE_ENTORNO}_INICIO", time.time()))
+    _activa, _prefijo = True, os.environ[VARIABLE_ENTORNO]
+    _pid = int(os.environ[f"{VARIABLE_ENTORNO}_PID"])
+    _inicio = time.perf_counter() - (time.time() - inicio_padre)
+    if os.environ.get(VARIABLE_MEMORIA, "0") not in ("", "0") and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def _al_bifurcar():
+    # Un hijo creado con fork hereda las etapas abiertas del padre: no son suyas
+    global _local
+    _local = threading.local()
+    _abiertas.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_al_bifurcar)
+
+
+def con_eventos(funcion, *args, **kwargs):
+    # Para tareas que corren en un pool de procesos: devuelve (resultado,
+    # eventos registrados durante la llamada). En el proceso que traza, o sin
+    # traza, los eventos quedan donde siempre y la lista vuelve vacía.
+    padre = os.environ.get(f"{VARIABLE_ENTORNO}_PID")
+    if padre is None or padre == str(os.getpid()):
+        return funcion(*args, **kwargs), []
+    _activar_en_hijo()
+    with _bloqueo:
+        desde = len(_eventos)
+    try:
+        resultado = funcion(*args, **kwargs)
+    finally:
+        # El proceso del pool se reutiliza: cada tarea se lleva solo lo suyo
+        with _bloqueo:
+            nuevos = _eventos[desde:]
+            del _eventos[desde:]
+    return resultado, nuevos
+
+
+def incorporar(lista):
+    # Suma a la traza los eventos que devolvió un proceso hijo (conservan su pid)
+    if not _activa or not lista:
+        return
+    with _bloqueo:
+        _eventos.extend(lista)
+
+
+def traza_chrome(lista):
+    # Formato "Trace Event" (eventos completos "X", tiempos en microsegundos)
+    pid = _pid or os.getpid()
+    return {"traceEvents": [{
+        "name": e["nombre"], "ph": "X", "pid": e.get("pid", pid), "tid": e["hilo"],
+        "ts": round(e["inicio_s"] * 1e6, 1), "dur": round(e["reloj_s"] * 1e6, 1),
+        "args": {"cpu_ms": round(e["cpu_s"] * 1e3, 3), "memoria_pico_mb": e["memoria_pico_mb"], **e["args"]},
+    } for e in lista], "displayTimeUnit": "ms"}
+
+
+def escribir_traza(prefijo=None):
+    if not _activa or os.getpid() != _pid:
+        return None
+    prefijo = prefijo or _prefijo
+    lista = sorted(eventos(), key=lambda e: e["inicio_s"])
+    carpeta = os.path.dirname(os.path.abspath(prefijo))
+    os.makedirs(carpeta, exist_ok=True)
+    with open(f"{prefijo}.json", "w", encoding="utf-8") as f:
+        json.dump({"pid": _pid, "total_s": time.perf_counter() - _inicio, "etapas": lista}, f, indent=2)
+    with open(f"{prefijo}.trace.json", "w", encoding="utf-8") as f:
+        json.dump(traza_chrome(lista), f)
+    print(f"\n⏱️  Traza con {len(lista)} etapas en {prefijo}.json y {prefijo}.trace.json")
+    return lista
+
+
+def _desde_entorno():
+    valor = os.environ.get(VARIABLE_ENTORNO)
+    padre = os.environ.get(f"{VARIABLE_ENTORNO}_PID")
+    if valor and valor != "0" and (padre is None or padre == str(os.getpid())):
+        memoria = os.environ.get(VARIABLE_MEMORIA, "0") not in ("", "0")
+        activar("traza" if valor == "1" else valor, memoria=memoria)
+
+
+_desde_entorno()
@@ -0,0 +1,148 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+from esquemas import FACTORES
+
+# -----------------------------------------------------------
+# Motor de intervalos: felicidad por niveles de cada factor
+# -----------------------------------------------------------
+# Generaliza los cuartiles de corrupción a cualquier conjunto de factores,
+# cantidad de intervalos por factor y método (cuantiles o ancho fijo), con
+# cortes opcionales por año y/o región. Los factores se leen una vez como
+# arreglos (sin copiar ni modificar el DataFrame), los límites de cada corte
+# se calculan para todos los factores a la vez y las estadísticas de todos
+# los (corte, factor, intervalo) salen de una sola pasada con np.bincount.
+# Como en pd.qcut, los intervalos son cerrados a derecha y el primero incluye
+# el mínimo.
+
+ETIQUETAS_CUARTILES = ["Muy baja", "Baja", "Alta", "Muy alta"]
+METODOS = ("cuantil", "ancho")
+
+
+def _por_factor(valor, factores, defecto):
+    if isinstance(valor, dict):
+        return [int(valor.get(f, defecto)) for f in factores]
+    return [int(valor)] * len(factores)
+
+
+def etiquetas_intervalos(n, metodo="cuantil"):
+    if metodo == "cuantil" and n == 4:
+        return list(ETIQUETAS_CUARTILES)
+    return [f"{'Q' if metodo == 'cuantil' else 'B'}{i + 1}" for i in range(n)]
+
+
+def _cortes(df, por):
+    # {clave del corte: índices de sus filas}; sin `por`, un único corte con todo
+    if not por:
+        return {(): np.arange(len(df))}
+    por = [por] if isinstance(por, str) else list(por)
+    indices = df.groupby(por, observed=True, sort=True).indices
+    return {(k if isinstance(k, tuple) else (k,)): v for k, v in indices.items()}
+
+
+def _limites(X, bins, metodo):
+    # X: (filas, factores) de un corte → límites (factores, max(bins) + 1);
+    # los factores con menos intervalos se completan con +inf
+    n_f, q_max = X.shape[1], max(bins)
+    limites = np.full((n_f, q_max + 1), np.inf)
+    with np.errstate(invalid="ignore"):
+        for q in sorted(set(bins)):
+            cols = [j for j in range(n_f) if bins[j] == q]
+            if len(X) == 0:
+                limites[cols, : q + 1] = np.nan
+            elif metodo == "cuantil":
+                limites[cols, : q + 1] = np.nanquantile(X[:, cols], np.linspace(0, 1, q + 1), axis=0).T
+            else:
+                minimo, maximo = np.nanmin(X[:, cols], axis=0), np.nanmax(X[:, cols], axis=0)
+                limites[cols, : q + 1] = (minimo + (maximo - minimo) * np.linspace(0, 1, q + 1)[:, None]).T
+    return limites
+
+
+def asignar_intervalos(df, factores=None, bins=4, metodo="cuantil", por=None, invertir=()):
+    # Devuelve el intervalo de cada fila y factor sin tocar `df`:
+    #   codigos: (filas, factores) con -1 si falta el valor o la fila no
+    #            pertenece a ningún corte; limites: (cortes, factores, q+1)
+    if metodo not in METODOS:
+        raise ValueError(f"Método desconocido: {metodo!r}. Opciones: {METODOS}")
+    factores = [f for f in (factores or FACTORES) if f in df.columns]
+    bins = _por_factor(bins, factores, 4)
+    if min(bins, default=1) < 1:
+        raise ValueError("Cada factor necesita al menos un intervalo")
+
+    # Una columna float32 se lee sin copia; solo se invierten las pedidas
+    X = np.column_stack([1 - df[f].to_numpy(dtype=np.float64) if f in invertir
+                         else df[f].to_numpy(dtype=np.float64) for f in factores])
+    cortes = _cortes(df, por)
+    codigos = np.full(X.shape, -1, dtype=np.int32)
+    id_corte = np.full(len(df), -1, dtype=np.int32)
+    limites = np.empty((len(cortes), len(factores), max(bins) + 1))
+
+    for s, filas in enumerate(cortes.values()):
+        Xs = X[filas]
+        lim = _limites(Xs, bins, metodo)
+        limites[s] = lim
+        # Intervalo = cantidad de límites interiores estrictamente superados
+        # (búsqueda binaria por factor: memoria O(filas), no O(filas × bins))
+        cod = np.empty(Xs.shape, dtype=np.int32)
+        for j, q in enumerate(bins):
+            cod[:, j] = np.searchsorted(lim[j, 1:q], Xs[:, j], side="left")
+        cod[np.isnan(Xs)] = -1
+        codigos[filas] = cod
+        id_corte[filas] = s
+
+    return {"factores": factores, "bins": bins, "metodo": metodo, "claves": list(cortes),
+            "codigos": codigos, "id_corte": id_corte, "limites": limites}
+
+
+def resumir_por_intervalos(df, factores=None, bins=4, metodo="cuantil", por=None, objetivo="Happiness",
+                           nivel=None, invertir=()):
+    # Tabla ordenada (corte, factor, intervalo) con mean, std, count del objetivo
+    # y, si se pide `nivel`, el IC de la media (aproximación normal)
+    asignacion = asignar_intervalos(df, factores, bins, metodo, por, invertir)
+    factores, bins = asignacion["factores"], asignacion["bins"]
+    codigos, id_corte = asignacion["codigos"], asignacion["id_corte"]
+    n_s, n_f, q_max = len(asignacion["claves"]), len(factores), max(bins)
+
+    y = df[objetivo].to_numpy(dtype=np.float64)
+    clave = (id_corte[:, None] * n_f + np.arange(n_f)[None, :]) * q_max + codigos
+    validos = (codigos >= 0) & (id_corte >= 0)[:, None] & ~np.isnan(y)[:, None]
+    clave = clave[validos]
+    yv = np.broadcast_to(y[:, None], codigos.shape)[validos]
+
+    total = n_s * n_f * q_max
+    count = np.bincount(clave, minlength=total).astype(np.float64)
+    suma = np.bincount(clave, weights=yv, minlength=total)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = suma / count
+        # Segunda pasada con los desvíos a la media de cada grupo (sin la
+        # cancelación de suma2 - n·media²)
+        m2 = np.bincount(clave, weights=(yv - mean[clave]) ** 2, minlength=total)
+        std = np.sqrt(m2 / (count - 1))
+    std[count < 2] = np.nan
+
+    s_idx, f_idx, b_idx = np.unravel_index(np.arange(total), (n_s, n_f, q_max))
+    limites = asignacion["limites"]
+    tabla = pd.DataFrame({
+        "factor": np.array(factores, dtype=object)[f_idx],
+        "intervalo": b_idx,
+        "limite_inf": limites[s_idx, f_idx, b_idx],
+        "limite_sup": limites[s_idx, f_idx, b_idx + 1],
+        "mean": mean,
+        "std": std,
+        "count": count.astype(np.int64),
+    })
+    if nivel is not None:
+        z = NormalDist().inv_cdf(0.5 + nivel / 2)
+        margen = z * tabla["std"] / np.sqrt(tabla["count"])
+        tabla["ic_inf"] = tabla["mean"] - margen
+        tabla["ic_sup"] = tabla["mean"] + margen
+
+    # Columnas del corte al principio y solo los intervalos que existen para cada factor
+    por = [] if not por else ([por] if isinstance(por, str) else list(por))
+    for k, col in enumerate(por):
+        tabla.insert(k, col, [asignacion["claves"][s][k] for s in s_idx])
+    tabla = tabla[b_idx < np.array(bins)[f_idx]].reset_index(drop=True)
+    etiquetas = {f: etiquetas_intervalos(q, metodo) for f, q in zip(factores, bins)}
+    tabla.insert(len(por) + 1, "grupo", [etiquetas[f][b] for f, b in zip(tabla["factor"], tabla["intervalo"])])
+    return tabla
@@ -0,0 +1,89 @@
+import os
+from instrumentacion import medido
+
+# -----------------------------------------------------------
+# Mapa coroplético animado por año (liviano)
+# -----------------------------------------------------------
+# Se agrega una sola vez por (país, año) y se arma una figura con un frame
+# por año que solo lleva códigos ISO-3, valores redondeados y el nombre del
+# país. La escala de color es fija para comparar entre años. Para reportes
+# con varias figuras, plotly.js se escribe una vez en la carpeta de salida y
+# cada HTML lo referencia en lugar de incrustarlo (varios MB por archivo).
+
+ARCHIVO_PLOTLYJS = "plotly.min.js"
+
+
+def agregar_por_pais_anio(df, valor="Happiness"):
+    clave = "ISO3" if "ISO3" in df.columns else "Country"
+    agregado = (df.dropna(subset=[clave, valor])
+                  .groupby([clave, "Year"], observed=True)
+                  .agg(Country=("Country", "first"), valor=(valor, "mean"))
+                  .reset_index())
+    return agregado.rename(columns={clave: "ubicacion", "valor": valor}), clave
+
+
+def _traza(sub, valor, modo, zmin, zmax):
+    import plotly.graph_objects as go
+    return go.Choropleth(
+        locations=sub["ubicacion"].astype(str).tolist(),
+        z=sub[valor].round(2).tolist(),
+        text=sub["Country"].astype(str).tolist(),
+        locationmode=modo,
+        zmin=zmin, zmax=zmax,
+        colorscale="Turbo",
+        hovertemplate="%{text}: %{z:.2f}<extra></extra>",
+        colorbar=dict(title="Felicidad", ticks="outside"),
+    )
+
+
+@medido()
+def figura_mapa_animada(df, valor="Happiness"):
+    import plotly.graph_objects as go
+    agregado, clave = agregar_por_pais_anio(df, valor)
+    modo = "ISO-3" if clave == "ISO3" else "country names"
+    zmin, zmax = float(agregado[valor].min()), float(agregado[valor].max())
+    anios = sorted(agregado["Year"].unique())
+    por_anio = {year: sub for year, sub in agregado.groupby("Year")}
+
+    frames = [go.Frame(name=str(year), data=[_traza(por_anio[year], valor, modo, zmin, zmax)]) for year in anios]
+    fig = go.Figure(data=frames[0].data, frames=frames)
+
+    pasos = [dict(method="animate", label=str(year),
+                  args=[[str(year)], dict(mode="immediate", frame=dict(duration=0, redraw=True))])
+             for year in anios]
+    fig.update_layout(
+        title="🌍 Índice de felicidad por país y año",
+        title_font=dict(size=18, family="Arial", color="black"),
+        geo=dict(showframe=False, showcoastlines=True, projection_type="natural earth"),
+        sliders=[dict(active=0, steps=pasos, currentvalue=dict(prefix="Año: "))],
+        updatemenus=[dict(type="buttons", showactive=False, x=0.05, y=0, buttons=[
+            dict(label="▶", method="animate",
+                 args=[None, dict(frame=dict(duration=800, redraw=True), fromcurrent=True)]),
+            dict(label="⏸", method="animate",
+                 args=[[None], dict(mode="immediate", frame=dict(duration=0, redraw=False))]),
+        ])],
+    )
+    return fig
+
+
+def escribir_plotlyjs(directorio):
+    # Copia plotly.js una sola vez en la carpeta de salida y devuelve su nombre relativo
+    from plotly.offline import get_plotlyjs
+    path = os.path.join(directorio, ARCHIVO_PLOTLYJS)
+    if not os.path.exists(path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(get_plotlyjs())
+    return ARCHIVO_PLOTLYJS
+
+
+@medido()
+def exportar_html(fig, path, plotlyjs="compartido"):
+    # plotlyjs: "compartido" (archivo externo junto al HTML), "cdn" o "inline"
+    if plotlyjs == "compartido":
+        incluir = escribir_plotlyjs(os.path.dirname(os.path.abspath(path)))
+    elif plotlyjs == "inline":
+        incluir = True
+    else:
+        incluir = plotlyjs
+    fig.write_html(path, include_plotlyjs=incluir, full_html=True, auto_play=False)
+    return path
@@ -0,0 +1,146 @@
+import os
+import json
+import re
+import unicodedata
+
+# -----------------------------------------------------------
+# Índice de países: alias → nombre canónico → código ISO-3
+# -----------------------------------------------------------
+# Los archivos de cada año escriben algunos países de forma distinta
+# ("Taiwan Province of China" / "Taiwan", "Trinidad & Tobago", ...). Este
+# índice los lleva a un único nombre y a su código ISO-3, de modo que los
+# cruces entre años se hagan por una clave exacta y el mapa use códigos en
+# lugar de resolver nombres fila por fila. El índice normalizado se construye
+# una vez y se guarda en data/.cache/paises_v<versión>.json.
+
+# Subir cuando cambie la tabla o los alias
+VERSION_INDICE = 1
+
+# Nombre canónico → ISO-3. Norte de Chipre y Somalilandia no tienen código
+# ISO asignado: su ISO3 queda en NA (no aparecen en el mapa ni se cruzan por
+# código con otras fuentes). Kosovo tampoco tiene uno oficial; "XKX" es el
+# código de usuario que usan la Comisión Europea y el Banco Mundial.
+PAISES_ISO3 = {
+    "Afghanistan": "AFG", "Albania": "ALB", "Algeria": "DZA", "Angola": "AGO", "Argentina": "ARG",
+    "Armenia": "ARM", "Australia": "AUS", "Austria": "AUT", "Azerbaijan": "AZE", "Bahrain": "BHR",
+    "Bangladesh": "BGD", "Belarus": "BLR", "Belgium": "BEL", "Belize": "BLZ", "Benin": "BEN",
+    "Bhutan": "BTN", "Bolivia": "BOL", "Bosnia and Herzegovina": "BIH", "Botswana": "BWA", "Brazil": "BRA",
+    "Bulgaria": "BGR", "Burkina Faso": "BFA", "Burundi": "BDI", "Cambodia": "KHM", "Cameroon": "CMR",
+    "Canada": "CAN", "Central African Republic": "CAF", "Chad": "TCD", "Chile": "CHL", "China": "CHN",
+    "Colombia": "COL", "Comoros": "COM", "Congo (Brazzaville)": "COG", "Congo (Kinshasa)": "COD",
+    "Costa Rica": "CRI", "Croatia": "HRV", "Cyprus": "CYP", "Czech Republic": "CZE", "Denmark": "DNK",
+    "Djibouti": "DJI", "Dominican Republic": "DOM", "Ecuador": "ECU", "Egypt": "EGY", "El Salvador": "SLV",
+    "Estonia": "EST", "Ethiopia": "ETH", "Finland": "FIN", "France": "FRA", "Gabon": "GAB",
+    "Gambia": "GMB", "Georgia": "GEO", "Germany": "DEU", "Ghana": "GHA", "Greece": "GRC",
+    "Guatemala": "GTM", "Guinea": "GIN", "Haiti": "HTI", "Honduras": "HND", "Hong Kong": "HKG",
+    "Hungary": "HUN", "Iceland": "ISL", "India": "IND", "Indonesia": "IDN", "Iran": "IRN",
+    "Iraq": "IRQ", "Ireland": "IRL", "Israel": "ISR", "Italy": "ITA", "Ivory Coast": "CIV",
+    "Jamaica": "JAM", "Japan": "JPN", "Jordan": "JOR", "Kazakhstan": "KAZ", "Kenya": "KEN",
+    "Kosovo": "XKX", "Kuwait": "KWT", "Kyrgyzstan": "KGZ", "Laos": "LAO", "Latvia": "LVA",
+    "Lebanon": "LBN", "Lesotho": "LSO", "Liberia": "LBR", "Libya": "LBY", "Lithuania": "LTU",
+    "Luxembourg": "LUX", "Madagascar": "MDG", "Malawi": "MWI", "Malaysia": "MYS", "Mali": "MLI",
+    "Malta": "MLT", "Mauritania": "MRT", "Mauritius": "MUS", "Mexico": "MEX", "Moldova": "MDA",
+    "Mongolia": "MNG", "Montenegro": "MNE", "Morocco": "MAR", "Mozambique": "MOZ", "Myanmar": "MMR",
+    "Namibia": "NAM", "Nepal": "NPL", "Netherlands": "NLD", "New Zealand": "NZL", "Nicaragua": "NIC",
+    "Niger": "NER", "Nigeria": "NGA", "North Macedonia": "MKD", "Northern Cyprus": None, "Norway": "NOR",
+    "Oman": "OMN", "Pakistan": "PAK", "Palestinian Territories": "PSE", "Panama": "PAN", "Paraguay": "PRY",
+    "Peru": "PER", "Philippines": "PHL", "Poland": "POL", "Portugal": "PRT", "Puerto Rico": "PRI",
+    "Qatar": "QAT", "Romania": "ROU", "Russia": "RUS", "Rwanda": "RWA", "Saudi Arabia": "SAU",
+    "Senegal": "SEN", "Serbia": "SRB", "Sierra Leone": "SLE", "Singapore": "SGP", "Slovakia": "SVK",
+    "Slovenia": "SVN", "Somalia": "SOM", "Somaliland Region": None, "South Africa": "ZAF",
+    "South Korea": "KOR", "South Sudan": "SSD", "Spain": "ESP", "Sri Lanka": "LKA", "Sudan": "SDN",
+    "Suriname": "SUR", "Swaziland": "SWZ", "Sweden": "SWE", "Switzerland": "CHE", "Syria": "SYR",
+    "Taiwan": "TWN", "Tajikistan": "TJK", "Tanzania": "TZA", "Thailand": "THA", "Togo": "TGO",
+    "Trinidad and Tobago": "TTO", "Tunisia": "TUN", "Turkey": "TUR", "Turkmenistan": "TKM",
+    "Uganda": "UGA", "Ukraine": "UKR", "United Arab Emirates": "ARE", "United Kingdom": "GBR",
+    "United States": "USA", "Uruguay": "URY", "Uzbekistan": "UZB", "Venezuela": "VEN", "Vietnam": "VNM",
+    "Yemen": "YEM", "Zambia": "ZMB", "Zimbabwe": "ZWE",
+}
+
+# Variantes vistas en los archivos (o habituales en otras fuentes) → nombre canónico
+ALIAS = {
+    "Taiwan Province of China": "Taiwan",
+    "Hong Kong S.A.R., China": "Hong Kong",
+    "Hong Kong S.A.R. of China": "Hong Kong",
+    "Trinidad & Tobago": "Trinidad and Tobago",
+    "North Cyprus": "Northern Cyprus",
+    "Macedonia": "North Macedonia",
+    "Somaliland region": "Somaliland Region",
+    "Eswatini": "Swaziland",
+    "Czechia": "Czech Republic",
+    "Cote d'Ivoire": "Ivory Coast",
+    "Palestine": "Palestinian Territories",
+    "State of Palestine": "Palestinian Territories",
+    "Republic of Korea": "South Korea",
+    "Korea, South": "South Korea",
+    "Russian Federation": "Russia",
+    "Viet Nam": "Vietnam",
+    "Lao PDR": "Laos",
+    "Syrian Arab Republic": "Syria",
+    "United States of America": "United States",
+    "Democratic Republic of the Congo": "Congo (Kinshasa)",
+    "Republic of the Congo": "Congo (Brazzaville)",
+}
+
+
+def _clave(nombre):
+    # Normalización tolerante: sin acentos, minúsculas, "&" → "and", sin puntuación
+    texto = unicodedata.normalize("NFKD", str(nombre)).encode("ascii", "ignore").decode()
+    texto = texto.casefold().replace("&", " and ")
+    return " ".join(re.sub(r"[^a-z0-9()]+", " ", texto).split())
+
+
+def _ruta_indice():
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_dir, "data", ".cache", f"paises_v{VERSION_INDICE}.json")
+
+
+def construir_indice():
+    indice = {_clave(nombre): nombre for nombre in PAISES_ISO3}
+    indice.update({_clave(alias): canonico for alias, canonico in ALIAS.items()})
+    return indice
+
+
+_INDICE = None
+
+
+def indice_paises():
+    # Se construye una sola vez por proceso y se persiste en disco
+    global _INDICE
+    if _INDICE is None:
+        path = _ruta_indice()
+        try:
+            with open(path, encoding="utf-8") as f:
+                _INDICE = json.load(f)
+        except (OSError, ValueError):
+            _INDICE = construir_indice()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(_INDICE, f, indent=0, ensure_ascii=False, sort_keys=True)
+    return _INDICE
+
+
+def nombre_canonico(nombre):
+    return indice_paises().get(_clave(nombre))
+
+
+def codigo_iso3(nombre):
+    canonico = nombre_canonico(nombre)
+    return PAISES_ISO3.get(canonico) if canonico else None
+
+
+def canonizar_paises(df):
+    # Unifica Country y agrega ISO3. Se resuelve una vez por nombre distinto
+    # (categorías), no por fila.
+    paises = df["Country"].astype("category")
+    nombres = list(paises.cat.categories)
+    canonicos = {n: nombre_canonico(n) or n for n in nombres}
+
+    desconocidos = [n for n in nombres if nombre_canonico(n) is None]
+    if desconocidos:
+        print(f"⚠️ Países sin código ISO-3 (se conservan tal cual): {desconocidos}")
+
+    df = df.copy()
+    df["Country"] = paises.map(canonicos).astype("category")
+    df["ISO3"] = df["Country"].map({c: PAISES_ISO3.get(c) for c in canonicos.values()}).astype("category")
+    return df
@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+from correlaciones import VARIABLES
+
+# -----------------------------------------------------------
+# Panel denso país × año × variable
+# -----------------------------------------------------------
+# Las preguntas entre años (cambios, normalización, rankings) sobre el
+# DataFrame largo terminan en groupby + realineación por nombre de país. El
+# panel guarda los mismos datos en un arreglo float32 de forma
+# (países, años, variables), indexado por los códigos enteros de la
+# categoría Country y por la posición del año, más una máscara de celdas
+# presentes. Las operaciones son vectorizadas sobre un eje:
+#   - eje 1 (años): cambios por país
+#   - eje 0 (países): normalización y rankings de cada año
+# Pasar del formato largo al panel es un solo scatter con los códigos de la
+# categoría (sin comparar cadenas); volver al formato largo con
+# completo=True no copia los valores: las columnas son vistas del arreglo.
+
+
+class Panel:
+    def __init__(self, valores, mascara, paises, anios, variables, regiones=None):
+        self.valores = valores
+        self.mascara = mascara
+        self.paises = pd.Index(paises)
+        self.anios = np.asarray(anios)
+        self.variables = list(variables)
+        self.regiones = regiones
+
+    @classmethod
+    def desde_largo(cls, df, variables=None):
+        # Si hay varias filas por (país, año) se promedian
+        variables = [v for v in (variables or VARIABLES) if v in df.columns]
+        paises = df["Country"].astype("category")
+        codigos = paises.cat.codes.to_numpy().astype(np.intp)
+        anios, pos_anio = np.unique(df["Year"].to_numpy(), return_inverse=True)
+        n_p, n_a, n_v = len(paises.cat.categories), len(anios), len(variables)
+
+        validos = codigos >= 0
+        plano = (codigos * n_a + pos_anio)[validos]
+        X = df[variables].to_numpy(dtype=np.float32)[validos]
+        valores = np.full((n_p * n_a, n_v), np.nan, dtype=np.float32)
+        conteo = np.bincount(plano, minlength=n_p * n_a)
+
+        if conteo.max(initial=0) <= 1:
+            valores[plano] = X
+        else:
+            presentes = ~np.isnan(X)
+            for j in range(n_v):
+                suma = np.bincount(plano, weights=np.where(presentes[:, j], X[:, j], 0.0), minlength=n_p * n_a)
+                n = np.bincount(plano, weights=presentes[:, j], minlength=n_p * n_a)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    valores[:, j] = suma / n
+
+        regiones = None
+        if "Region" in df.columns:
+            # Región de cada país: la primera fila con región conocida
+            region = df["Region"].astype("category")
+            cod_region = region.cat.codes.to_numpy()
+            con_region = validos & (cod_region >= 0)
+            por_pais = np.full(n_p, -1, dtype=np.int64)
+            orden = np.flatnonzero(con_region)[::-1]
+            por_pais[codigos[orden]] = cod_region[orden]
+            regiones = pd.Categorical.from_codes(por_pais, categories=region.cat.categories)
+
+        return cls(valores.reshape(n_p, n_a, n_v), (conteo > 0).reshape(n_p, n_a),
+                   paises.cat.categories, anios, variables, regiones)
+
+    @property
+    def forma(self):
+        return self.valores.shape
+
+    def variable(self, nombre):
+        # Vista (países, años) de una variable
+        return self.valores[:, :, self.variables.index(nombre)]
+
+    def posicion_anio(self, year):
+        pos = np.searchsorted(self.anios, year)
+        if pos >= len(self.anios) or self.anios[pos] != year:
+            raise KeyError(f"No hay datos para {year}. Años disponibles: {self.anios.tolist()}")
+        return int(pos)
+
+    # -------------------------------------------------------
+    # Operaciones vectorizadas
+    # -------------------------------------------------------
+
+    def deltas(self, variable=None, paso=1):
+        # Cambio de cada país respecto de `paso` años antes (posiciones del eje
+        # de años). NaN si falta alguno de los dos.
+        if not 1 <= paso < len(self.anios):
+            raise ValueError(f"paso debe estar entre 1 y {len(self.anios) - 1} (hay {len(self.anios)} años); "
+                             f"se pidió {paso}")
+        datos = self.valores if variable is None else self.variable(variable)
+        resultado = np.full_like(datos, np.nan)
+        resultado[:, paso:] = datos[:, paso:] - datos[:, :-paso]
+        return resultado
+
+    def normalizar_por_anio(self, metodo="z"):
+        # z-score (o min-max) de cada variable entre los países de cada año
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if metodo == "z":
+                media = np.nanmean(self.valores, axis=0, keepdims=True)
+                desvio = np.nanstd(self.valores, axis=0, ddof=1, keepdims=True)
+                return (self.valores - media) / desvio
+            if metodo == "minmax":
+                minimo = np.nanmin(self.valores, axis=0, keepdims=True)
+                maximo = np.nanmax(self.valores, axis=0, keepdims=True)
+                return (self.valores - minimo) / (maximo - minimo)
+        raise ValueError(f"Método de normalización desconocido: {metodo!r} (use 'z' o 'minmax')")
+
+    def rangos(self, variable="Happiness"):
+        # Puesto de cada país en cada año (1 = mayor valor); NaN si no tiene dato
+        datos = self.variable(variable)
+        orden = np.argsort(np.where(np.isnan(datos), np.inf, -datos), axis=0, kind="stable")
+        rangos = np.empty(datos.shape, dtype=np.float32)
+        np.put_along_axis(rangos, orden, np.arange(1, datos.shape[0] + 1, dtype=np.float32)[:, None], axis=0)
+        rangos[np.isnan(datos)] = np.nan
+        return rangos
+
+    def promedio_por_anio(self, variable="Happiness"):
+        # Acumula en float64 y vuelve al tipo del panel, como groupby().mean()
+        datos = self.variable(variable)
+        with np.errstate(invalid="ignore"):
+            promedio = np.nanmean(datos, axis=0, dtype=np.float64).astype(datos.dtype)
+        return pd.Series(promedio, index=pd.Index(self.anios, name="Year"), name=variable)
+
+    # -------------------------------------------------------
+    # Conversión al formato largo
+    # -------------------------------------------------------
+
+    def a_largo(self, completo=False):
+        # completo=True: una fila por celda (países × años), con los valores
+        # como vistas del arreglo. Si no, solo las celdas presentes (copia).
+        n_p, n_a, n_v = self.valores.shape
+        planos = self.valores.reshape(n_p * n_a, n_v)
+        cod_pais = np.repeat(np.arange(n_p), n_a)
+        pos_anio = np.tile(np.arange(n_a), n_p)
+        if not completo:
+            filas = np.flatnonzero(self.mascara.ravel())
+            planos, cod_pais, pos_anio = planos[filas], cod_pais[filas], pos_anio[filas]
+
+        columnas = {"Country": pd.Categorical.from_codes(cod_pais, categories=self.paises)}
+        columnas.update({v: planos[:, j] for j, v in enumerate(self.variables)})
+        if self.regiones is not None:
+            columnas["Region"] = pd.Categorical.from_codes(self.regiones.codes[cod_pais],
+                                                           categories=self.regiones.categories)
+        columnas["Year"] = self.anios[pos_anio]
+        return pd.DataFrame(columnas, copy=False)
+
+
+def construir_panel(df, variables=None):
+    return Panel.desde_largo(df, variables)
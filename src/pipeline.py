@@ -0,0 +1,321 @@
+import os
+import sys
+import json
+import types
+import pickle
+import hashlib
+import inspect
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import codigo_completo as cc
+from cache_datos import directorio_cache, hash_contenido
+from correlaciones import construir_motor
+from mapas import agregar_por_pais_anio
+from rankings import construir_indice
+from panel import construir_panel
+from instrumentacion import etapa as medir_etapa
+
+# -----------------------------------------------------------
+# Pipeline por etapas con resultados memoizados en disco
+# -----------------------------------------------------------
+# Cada análisis se declara como una etapa con entradas explícitas (otras
+# etapas) y parámetros. La clave de una etapa combina la versión de su código
+# (el fuente de la función y de todo lo que llama dentro de src/), sus
+# parámetros y las claves de sus entradas, así que se calcula sin ejecutar
+# nada. El resultado se guarda en data/.cache/etapas/<etapa>/<clave>.pkl:
+# si se cambia solo el código del radar, únicamente esa clave cambia y el
+# resto de las etapas se lee de disco. Las entradas se cargan solo cuando
+# alguna etapa que las usa se tiene que recalcular, y las etapas
+# independientes corren en paralelo (hilos: pandas y numpy liberan el GIL
+# en las operaciones pesadas y no hay que copiar los DataFrames).
+#
+#   python src/cli.py pipeline
+#   python src/cli.py pipeline --etapas radar,top --forzar radar
+
+# Subir si cambia el formato de los archivos memoizados
+VERSION_ETAPAS = 1
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Etapa:
+    def __init__(self, nombre, funcion, entradas=(), parametros=None, huella=None, memoizar=True):
+        # `huella` reemplaza a los parámetros al calcular la clave (p. ej. el
+        # hash de los CSV en lugar de sus rutas)
+        self.nombre = nombre
+        self.funcion = funcion
+        self.entradas = tuple(entradas)
+        self.parametros = parametros or {}
+        self.huella = self.parametros if huella is None else huella
+        self.memoizar = memoizar
+
+    def __repr__(self):
+        return f"Etapa({self.nombre!r}, entradas={list(self.entradas)})"
+
+
+# -----------------------------------------------------------
+# Versión de código
+# -----------------------------------------------------------
+
+def _es_del_proyecto(obj):
+    modulo = sys.modules.get(getattr(obj, "__module__", None) or "")
+    archivo = getattr(modulo, "__file__", None)
+    return archivo is not None and os.path.dirname(os.path.abspath(archivo)) == SRC_DIR
+
+
+def _nombres(codigo):
+    # Nombres globales y atributos usados, incluidas funciones anidadas y lambdas
+    nombres = set(codigo.co_names)
+    for const in codigo.co_consts:
+        if isinstance(const, types.CodeType):
+            nombres |= _nombres(const)
+    return nombres
+
+
+def _dependencias(obj, nombres):
+    # Funciones, clases y constantes de src/ alcanzables desde `obj`
+    espacio = getattr(obj, "__globals__", None) or vars(sys.modules[obj.__module__])
+    modulos = [v for v in espacio.values() if isinstance(v, types.ModuleType) and
+               os.path.dirname(os.path.abspath(getattr(v, "__file__", None) or "")) == SRC_DIR]
+    for nombre in sorted(nombres):
+        candidatos = [espacio[nombre]] if nombre in espacio else []
+        candidatos += [getattr(m, nombre) for m in modulos if hasattr(m, nombre)]
+        for valor in candidatos:
+            if isinstance(valor, (types.FunctionType, type)) and _es_del_proyecto(valor):
+                yield f"{valor.__module__}.{valor.__qualname__}", valor
+            elif isinstance(valor, (int, float, str, tuple)) and nombre.isupper():
+                yield f"{nombre}", valor
+
+
+def huella_codigo(funcion):
+    # Hash del fuente de la función y de lo que usa, recorriendo las llamadas
+    # dentro de src/. Las constantes en MAYÚSCULAS (VERSION_*) también cuentan.
+    h = hashlib.sha256()
+    vistos = set()
+    pendientes = [(f"{funcion.__module__}.{funcion.__qualname__}", funcion)]
+    while pendientes:
+        clave, obj = pendientes.pop()
+        if clave in vistos:
+            continue
+        vistos.add(clave)
+        if not isinstance(obj, (types.FunctionType, type)):
+            h.update(f"{clave}={obj!r}\n".encode())
+            continue
+        # Las funciones decoradas con @medido se recorren desde la original
+        obj = inspect.unwrap(obj)
+        h.update(f"{clave}\n{inspect.getsource(obj)}\n".encode())
+        if isinstance(obj, type):
+            codigos = [m.__code__ for m in vars(obj).values() if isinstance(m, types.FunctionType)]
+            nombres = set().union(*[_nombres(c) for c in codigos]) if codigos else set()
+            espacio_obj = next((m for m in vars(obj).values() if isinstance(m, types.FunctionType)), obj)
+        else:
+            nombres, espacio_obj = _nombres(obj.__code__), obj
+        pendientes.extend(_dependencias(espacio_obj, nombres))
+    return h.hexdigest()
+
+
+# -----------------------------------------------------------
+# Motor
+# -----------------------------------------------------------
+
+def _ejecutar_etapa(etapa, entradas):
+    with medir_etapa(f"etapa:{etapa.nombre}"):
+        return etapa.funcion(**entradas, **etapa.parametros)
+
+
+class Pipeline:
+    def __init__(self, etapas, cache_dir=None, hilos=None):
+        self.etapas = {e.nombre: e for e in etapas}
+        for etapa in etapas:
+            faltantes = [n for n in etapa.entradas if n not in self.etapas]
+            if faltantes:
+                raise ValueError(f"La etapa {etapa.nombre!r} depende de etapas no declaradas: {faltantes}")
+        self.cache_dir = os.path.join(cache_dir or directorio_cache(), "etapas")
+        self.hilos = hilos
+        self._claves = None
+
+    def orden(self, objetivos=None):
+        # Orden topológico de los objetivos y sus entradas
+        orden, visitando = [], set()
+
+        def visitar(nombre):
+            if nombre in orden:
+                return
+            if nombre in visitando:
+                raise ValueError(f"Ciclo en el pipeline en la etapa {nombre!r}")
+            visitando.add(nombre)
+            for entrada in self.etapas[nombre].entradas:
+                visitar(entrada)
+            visitando.discard(nombre)
+            orden.append(nombre)
+
+        for nombre in objetivos or self.etapas:
+            if nombre not in self.etapas:
+                raise ValueError(f"Etapa desconocida: {nombre!r}. Disponibles: {list(self.etapas)}")
+            visitar(nombre)
+        return orden
+
+    def claves(self):
+        if self._claves is None:
+            claves = {}
+            for nombre in self.orden():
+                etapa = self.etapas[nombre]
+                contenido = json.dumps({
+                    "version": VERSION_ETAPAS,
+                    "etapa": nombre,
+                    "codigo": huella_codigo(etapa.funcion),
+                    "parametros": etapa.huella,
+                    "entradas": {e: claves[e] for e in etapa.entradas},
+                }, sort_keys=True, default=str)
+                claves[nombre] = hashlib.sha256(contenido.encode()).hexdigest()[:24]
+            self._claves = claves
+        return self._claves
+
+    def _ruta(self, nombre):
+        return os.path.join(self.cache_dir, nombre, f"{self.claves()[nombre]}.pkl")
+
+    def _leer(self, nombre):
+        with open(self._ruta(nombre), "rb") as f:
+            return pickle.load(f)
+
+    def _guardar(self, nombre, valor):
+        path = self._ruta(nombre)
+        carpeta = os.path.dirname(path)
+        os.makedirs(carpeta, exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}-{id(valor)}"
+        with open(tmp, "wb") as f:
+            pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        # Solo se conserva la última versión de cada etapa
+        for archivo in os.listdir(carpeta):
+            if archivo != os.path.basename(path) and archivo.endswith(".pkl"):
+                os.remove(os.path.join(carpeta, archivo))
+
+    def memoizada(self, nombre):
+        return self.etapas[nombre].memoizar and os.path.exists(self._ruta(nombre))
+
+    def ejecutar(self, objetivos=None, forzar=()):
+        # Devuelve {etapa: resultado} para los objetivos (por defecto todas).
+        # `self.estado` queda con "memoria" o "calculada" por etapa.
+        objetivos = list(objetivos or self.etapas)
+        forzar = set(forzar)
+        orden = self.orden(objetivos)
+
+        # Etapas a recalcular y entradas que hay que tener en memoria para ellas
+        recalcular = [n for n in orden if n in forzar or not self.memoizada(n)]
+        necesarias = set(objetivos)
+        for nombre in recalcular:
+            necesarias |= set(self.etapas[nombre].entradas)
+        necesarias |= set(recalcular)
+
+        resultados = {}
+        self.estado = {}
+        for nombre in orden:
+            if nombre in necesarias and nombre not in recalcular:
+                resultados[nombre] = self._leer(nombre)
+                self.estado[nombre] = "memoria"
+
+        pendientes = [n for n in orden if n in recalcular]
+        with ThreadPoolExecutor(max_workers=self.hilos) as pool:
+            en_curso = {}
+            while pendientes or en_curso:
+                listas = [n for n in pendientes
+                          if all(e in resultados for e in self.etapas[n].entradas)]
+                for nombre in listas:
+                    etapa = self.etapas[nombre]
+                    kwargs = {e: resultados[e] for e in etapa.entradas}
+                    en_curso[pool.submit(_ejecutar_etapa, etapa, kwargs)] = nombre
+                    pendientes.remove(nombre)
+                hechas, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in hechas:
+                    nombre = en_curso.pop(futuro)
+                    resultados[nombre] = futuro.result()
+                    self.estado[nombre] = "calculada"
+                    if self.etapas[nombre].memoizar:
+                        self._guardar(nombre, resultados[nombre])
+
+        return {n: resultados[n] for n in objetivos}
+
+
+# -----------------------------------------------------------
+# Etapas del análisis (mismas preguntas que codigo_completo.ejecutar_todo)
+# -----------------------------------------------------------
+
+def etapa_datos(fuentes):
+    return cc.cargar_datos(fuentes)
+
+
+def etapa_motor(datos):
+    return construir_motor(datos)
+
+
+def etapa_factores(datos, motor):
+    return cc.correlaciones_factores(datos, motor)
+
+
+def etapa_importancia(datos):
+    return cc.importancia_factores(datos, semilla=0)
+
+
+def etapa_panel(datos):
+    return construir_panel(datos)
+
+
+def etapa_tendencias(panel):
+    return cc.calcular_tendencia(panel)
+
+
+def etapa_tendencias_pais(panel):
+    return cc.calcular_tendencias_paises(panel)
+
+
+def etapa_corrupcion(datos, motor):
+    grouped = cc.agrupar_corrupcion(datos)
+    r, n = motor.par("Corruption", "Happiness")
+    return {"grupos": grouped, "r": -r, "n": n}
+
+
+def etapa_rankings(datos):
+    return construir_indice(datos)
+
+
+def etapa_top(rankings, n=10):
+    return rankings.top(n)
+
+
+def etapa_mapa(datos):
+    agregado, _ = agregar_por_pais_anio(datos)
+    return agregado
+
+
+def etapa_radar(datos, motor):
+    return cc.correlaciones_radar(datos, motor)
+
+
+def etapas_analisis(dict_files, n_top=10):
+    # El hash de cada CSV (o miembro del ZIP) entra en la clave de la carga,
+    # y a través de ella en la de todas las demás etapas
+    fuentes = {name: hash_contenido(origen) for name, origen in sorted(dict_files.items())}
+    return [
+        Etapa("datos", etapa_datos, parametros={"fuentes": dict_files}, huella={"fuentes": fuentes}),
+        Etapa("motor", etapa_motor, ["datos"]),
+        Etapa("factores", etapa_factores, ["datos", "motor"]),
+        Etapa("importancia", etapa_importancia, ["datos"]),
+        Etapa("panel", etapa_panel, ["datos"]),
+        Etapa("tendencias", etapa_tendencias, ["panel"]),
+        Etapa("tendencias_pais", etapa_tendencias_pais, ["panel"]),
+        Etapa("corrupcion", etapa_corrupcion, ["datos", "motor"]),
+        Etapa("rankings", etapa_rankings, ["datos"]),
+        Etapa("top", etapa_top, ["rankings"], parametros={"n": n_top}),
+        Etapa("mapa", etapa_mapa, ["datos"]),
+        Etapa("radar", etapa_radar, ["datos", "motor"]),
+    ]
+
+
+def ejecutar_pipeline(dict_files, objetivos=None, forzar=(), cache_dir=None, hilos=None, n_top=10):
+    pipeline = Pipeline(etapas_analisis(dict_files, n_top=n_top), cache_dir=cache_dir, hilos=hilos)
+    resultados = pipeline.ejecutar(objetivos, forzar=forzar)
+    for nombre, estado in pipeline.estado.items():
+        icono = "♻️ " if estado == "memoria" else "⚙️ "
+        print(f"{icono} {nombre:<11} {estado} ({pipeline.claves()[nombre][:10]})")
+    return resultados
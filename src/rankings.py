@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------
+# Índice de rankings por año y región
+# -----------------------------------------------------------
+# Se construye una vez después de cargar los datos: una fila por (país, año),
+# el orden descendente de cada año y, derivado de él sin volver a ordenar,
+# el de cada (año, región). Con eso un top-k es tomar los primeros k índices,
+# el puesto de un país es una búsqueda en un diccionario y los cambios de
+# puesto entre dos años se ordenan una sola vez por par de años, así que
+# "los que más subieron" también sale en O(k). Los cortes que no están
+# precalculados (todos los años juntos) usan selección parcial (argpartition).
+
+
+def top_k(valores, k):
+    # Índices de los k mayores sin ordenar todo el arreglo: O(n + k log k)
+    k = min(k, len(valores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    candidatos = np.argpartition(-valores, k - 1)[:k]
+    return candidatos[np.argsort(-valores[candidatos], kind="stable")]
+
+
+class IndiceRankings:
+    def __init__(self, df, valor="Happiness"):
+        self.valor = valor
+        if "Region" not in df.columns:
+            df = df.assign(Region=None)
+        por_pais = (df.dropna(subset=[valor])
+                      .groupby(["Year", "Country"], observed=True, sort=False)
+                      .agg(valor=(valor, "mean"), Region=("Region", "first"))
+                      .reset_index())
+
+        self.anios = sorted(int(a) for a in por_pais["Year"].unique())
+        self._anios = {}
+        self._regiones = {}
+        self._movimientos = {}
+        for year, sub in por_pais.groupby("Year", sort=True):
+            year = int(year)
+            valores = sub["valor"].to_numpy(dtype=np.float64)
+            paises = sub["Country"].astype(str).to_numpy()
+            regiones = sub["Region"].astype(object).where(sub["Region"].notna(), None).to_numpy()
+            orden = np.argsort(-valores, kind="stable")
+            rango = np.empty(len(orden), dtype=np.int64)
+            rango[orden] = np.arange(1, len(orden) + 1)
+            self._anios[year] = {
+                "valores": valores,
+                "paises": paises,
+                "regiones": regiones,
+                "orden": orden,
+                "rango": dict(zip(paises, rango.tolist())),
+            }
+            # El orden por región hereda el del año (filtrar conserva el orden)
+            regiones_ordenadas = regiones[orden]
+            for region in pd.unique(regiones_ordenadas):
+                if region is not None:
+                    self._regiones[(year, region)] = orden[regiones_ordenadas == region]
+
+        for desde, hasta in zip(self.anios, self.anios[1:]):
+            self._movimientos_entre(desde, hasta)
+
+    # -------------------------------------------------------
+    # Consultas
+    # -------------------------------------------------------
+
+    def _anio(self, year):
+        year = self.anios[-1] if year is None else int(year)
+        if year not in self._anios:
+            raise KeyError(f"No hay datos para {year}. Años disponibles: {self.anios}")
+        return year
+
+    def _tabla(self, year, indices, rangos):
+        datos = self._anios[year]
+        return pd.DataFrame({
+            "Rank": rangos,
+            "Country": datos["paises"][indices],
+            "Region": datos["regiones"][indices],
+            "Year": year,
+            self.valor: datos["valores"][indices],
+        })
+
+    def top(self, k=10, year=None, region=None):
+        # Top-k de un año (por defecto el último), opcionalmente dentro de una región
+        year = self._anio(year)
+        if region is None:
+            indices = self._anios[year]["orden"][:k]
+            return self._tabla(year, indices, np.arange(1, len(indices) + 1))
+        indices = self._regiones.get((year, region), np.empty(0, dtype=np.intp))[:k]
+        rangos = [self._anios[year]["rango"][p] for p in self._anios[year]["paises"][indices]]
+        tabla = self._tabla(year, indices, np.arange(1, len(indices) + 1))
+        return tabla.assign(RankGlobal=rangos)
+
+    def top_todos_los_anios(self, k=10):
+        # Mejores (país, año) del panel completo, con selección parcial
+        def unir(campo):
+            return np.concatenate([self._anios[y][campo] for y in self.anios])
+
+        valores = unir("valores")
+        indices = top_k(valores, k)
+        anios = np.concatenate([np.full(len(self._anios[y]["valores"]), y) for y in self.anios])
+        return pd.DataFrame({
+            "Rank": np.arange(1, len(indices) + 1),
+            "Country": unir("paises")[indices],
+            "Region": unir("regiones")[indices],
+            "Year": anios[indices],
+            self.valor: valores[indices],
+        })
+
+    def rango(self, pais, year=None):
+        return self._anios[self._anio(year)]["rango"].get(pais)
+
+    def delta(self, pais, desde, hasta):
+        # Puestos ganados entre dos años (positivo = subió); None si falta en alguno
+        a, b = self.rango(pais, desde), self.rango(pais, hasta)
+        return None if a is None or b is None else a - b
+
+    def _movimientos_entre(self, desde, hasta):
+        clave = (self._anio(desde), self._anio(hasta))
+        if clave not in self._movimientos:
+            rango_a, rango_b = self._anios[clave[0]]["rango"], self._anios[clave[1]]["rango"]
+            paises = np.array([p for p in rango_b if p in rango_a], dtype=object)
+            desde_r = np.array([rango_a[p] for p in paises], dtype=np.int64)
+            hasta_r = np.array([rango_b[p] for p in paises], dtype=np.int64)
+            delta = desde_r - hasta_r
+            orden = np.argsort(-delta, kind="stable")
+            self._movimientos[clave] = (paises[orden], desde_r[orden], hasta_r[orden], delta[orden])
+        return self._movimientos[clave]
+
+    def mayores_cambios(self, k=10, desde=None, hasta=None, bajadas=False):
+        # Países que más puestos ganaron (o perdieron con bajadas=True) entre
+        # dos años; por defecto los dos últimos
+        hasta = self._anio(hasta)
+        if desde is None:
+            pos = self.anios.index(hasta)
+            if pos == 0:
+                raise ValueError(f"No hay un año anterior a {hasta} para comparar")
+            desde = self.anios[pos - 1]
+        if int(desde) == hasta:
+            raise ValueError(f"'desde' y 'hasta' son el mismo año ({hasta})")
+        paises, desde_r, hasta_r, delta = self._movimientos_entre(desde, hasta)
+        sel = slice(None, -k - 1, -1) if bajadas else slice(None, k)
+        return pd.DataFrame({
+            "Country": paises[sel],
+            f"Rank{int(desde)}": desde_r[sel],
+            f"Rank{int(hasta)}": hasta_r[sel],
+            "Delta": delta[sel],
+        })
+
+
+def construir_indice(df, valor="Happiness"):
+    return IndiceRankings(df, valor)
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+# -----------------------------------------------------------
+# Bootstrap y pruebas de permutación vectorizadas
+# -----------------------------------------------------------
+# Los remuestreos se generan en bloques de b filas: cada bloque es una matriz
+# (b, n) de índices o permutaciones y el estadístico se calcula por filas con
+# NumPy. El tamaño del bloque limita la memoria (max_elementos) y cada bloque
+# tiene su propia semilla derivada de `semilla`, así que el resultado es el
+# mismo con uno o varios procesos.
+
+MAX_ELEMENTOS = 5_000_000
+
+
+def _pearson_filas(X, Y):
+    Xc = X - X.mean(axis=1, keepdims=True)
+    Yc = Y - Y.mean(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (Xc * Yc).sum(axis=1) / np.sqrt((Xc * Xc).sum(axis=1) * (Yc * Yc).sum(axis=1))
+
+
+def _bloque_bootstrap_r(x, y, semilla, b):
+    rng = np.random.default_rng(semilla)
+    idx = rng.integers(0, len(x), size=(b, len(x)))
+    return _pearson_filas(x[idx], y[idx])
+
+
+def _bloque_permutacion_r(x, y, semilla, b):
+    rng = np.random.default_rng(semilla)
+    Y = rng.permuted(np.broadcast_to(y, (b, len(y))), axis=1)
+    return _pearson_filas(np.broadcast_to(x, (b, len(x))), Y)
+
+
+def _bloque_bootstrap_media(v, semilla, b):
+    rng = np.random.default_rng(semilla)
+    return v[rng.integers(0, len(v), size=(b, len(v)))].mean(axis=1)
+
+
+def _bloques(total, n, semilla, max_elementos):
+    b = max(1, min(total, max_elementos // max(n, 1)))
+    tamanos = [b] * (total // b) + ([total % b] if total % b else [])
+    if not isinstance(semilla, np.random.SeedSequence):
+        semilla = np.random.SeedSequence(semilla)
+    semillas = semilla.spawn(len(tamanos))
+    return list(zip(semillas, tamanos))
+
+
+def _ejecutar(funcion, datos, bloques, procesos):
+    if procesos == 1 or len(bloques) == 1:
+        return np.concatenate([funcion(*datos, s, b) for s, b in bloques])
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = [pool.submit(funcion, *datos, s, b) for s, b in bloques]
+        return np.concatenate([f.result() for f in futuros])
+
+
+def _pares_completos(x, y):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    ok = ~(np.isnan(x) | np.isnan(y))
+    return x[ok], y[ok]
+
+
+def bootstrap_pearson(x, y, n_remuestras=10_000, nivel=0.95, semilla=None, procesos=1,
+                      max_elementos=MAX_ELEMENTOS):
+    x, y = _pares_completos(x, y)
+    bloques = _bloques(n_remuestras, len(x), semilla, max_elementos)
+    rs = _ejecutar(_bloque_bootstrap_r, (x, y), bloques, procesos)
+    alfa = (1 - nivel) / 2
+    inf, sup = np.nanquantile(rs, [alfa, 1 - alfa])
+    return {"r": float(_pearson_filas(x[None], y[None])[0]), "ic_inf": float(inf), "ic_sup": float(sup),
+            "n": int(len(x)), "remuestras": int(n_remuestras)}
+
+
+def permutacion_pearson(x, y, n_permutaciones=10_000, semilla=None, procesos=1,
+                        max_elementos=MAX_ELEMENTOS):
+    # Valor p bilateral: proporción de permutaciones con |r| al menos tan grande como el observado
+    x, y = _pares_completos(x, y)
+    r_obs = float(_pearson_filas(x[None], y[None])[0])
+    bloques = _bloques(n_permutaciones, len(x), semilla, max_elementos)
+    rs = _ejecutar(_bloque_permutacion_r, (x, y), bloques, procesos)
+    extremos = int(np.sum(np.abs(rs) >= abs(r_obs) - 1e-12))
+    return {"r": r_obs, "p": (extremos + 1) / (n_permutaciones + 1), "permutaciones": int(n_permutaciones)}
+
+
+def bootstrap_medias(valores, grupos, n_remuestras=10_000, nivel=0.95, semilla=None, procesos=1,
+                     max_elementos=MAX_ELEMENTOS):
+    # Intervalo de confianza de la media por grupo (remuestreo dentro de cada grupo)
+    valores = pd.Series(np.asarray(valores, dtype=np.float64))
+    # Se conserva el tipo de los grupos (p. ej. cuartiles categóricos) para respetar su orden
+    grupos = pd.Series(grupos).reset_index(drop=True)
+    ok = valores.notna() & grupos.notna()
+    alfa = (1 - nivel) / 2
+    semillas = np.random.SeedSequence(semilla).spawn(grupos[ok].nunique())
+
+    filas = []
+    for (grupo, v), s in zip(valores[ok].groupby(grupos[ok], observed=True), semillas):
+        v = v.to_numpy()
+        bloques = _bloques(n_remuestras, len(v), s, max_elementos)
+        medias = _ejecutar(_bloque_bootstrap_media, (v,), bloques, procesos)
+        inf, sup = np.quantile(medias, [alfa, 1 - alfa])
+        filas.append({"grupo": grupo, "mean": v.mean(), "ic_inf": inf, "ic_sup": sup, "count": len(v)})
+    return pd.DataFrame(filas, columns=["grupo", "mean", "ic_inf", "ic_sup", "count"])
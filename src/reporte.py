@@ -0,0 +1,164 @@
+import os
+import json
+import html
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# Backend sin ventana: el modo reporte corre en servidores sin pantalla
+import matplotlib
+matplotlib.use("Agg")
+
+import codigo_completo as cc
+from mapas import figura_mapa_animada, exportar_html, escribir_plotlyjs
+from instrumentacion import etapa, medido, con_eventos, incorporar
+
+# -----------------------------------------------------------
+# Modo reporte por lotes (sin interfaz gráfica)
+# -----------------------------------------------------------
+# Cada análisis expone una función figura_*(df) que devuelve la figura sin
+# mostrarla. Aquí se arma la lista de figuras (global y variantes por año o
+# región), se renderizan en paralelo en un pool de procesos y se escribe un
+# índice (index.html + indice.json) en la carpeta de salida.
+
+FIGURAS = {
+    "factores": cc.figura_factores,
+    "tendencias": cc.figura_tendencias,
+    "corrupcion": cc.figura_corrupcion,
+    "mapa": cc.figura_mapa,
+    "mapa_animado": figura_mapa_animada,
+    "radar": cc.figura_radar,
+}
+
+# Figuras que no tienen sentido con un solo año
+SOLO_MULTIANIO = {"tendencias", "mapa_animado"}
+
+
+def tareas_reporte(df, por_anio=False, por_region=False, figuras=None):
+    figuras = figuras or list(FIGURAS)
+    tareas = [(f"{clave}", clave, df) for clave in figuras]
+
+    if por_anio:
+        for year, sub in df.groupby("Year", observed=True):
+            tareas += [(f"{clave}_{year}", clave, sub) for clave in figuras if clave not in SOLO_MULTIANIO]
+
+    if por_region and "Region" in df.columns:
+        for region, sub in df.groupby("Region", observed=True):
+            slug = "".join(c if c.isalnum() else "_" for c in str(region)).strip("_").lower()
+            tareas += [(f"{clave}_{slug}", clave, sub) for clave in figuras]
+    return tareas
+
+
+@medido()
+def _guardar_matplotlib(fig, base, formatos):
+    import matplotlib.pyplot as plt
+    archivos = []
+    for fmt in formatos:
+        if fmt in ("png", "svg"):
+            fig.savefig(f"{base}.{fmt}", dpi=120)
+            archivos.append(f"{base}.{fmt}")
+    plt.close(fig)
+    return archivos
+
+
+@medido()
+def _guardar_plotly(fig, base, formatos, plotlyjs):
+    archivos = []
+    for fmt in formatos:
+        if fmt == "html":
+            exportar_html(fig, f"{base}.html", plotlyjs)
+            archivos.append(f"{base}.html")
+        elif fmt in ("png", "svg"):
+            # La exportación estática de plotly necesita kaleido; si no está se omite
+            try:
+                fig.write_image(f"{base}.{fmt}")
+                archivos.append(f"{base}.{fmt}")
+            except (ImportError, ValueError, RuntimeError) as e:
+                motivo = str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__
+                print(f"⚠️ No se pudo exportar {os.path.basename(base)}.{fmt}: {motivo}")
+    return archivos
+
+
+def renderizar(nombre, clave, df, salida, formatos, plotlyjs="compartido"):
+    with etapa("render", figura=nombre):
+        return _renderizar(nombre, clave, df, salida, formatos, plotlyjs)
+
+
+def renderizar_en_hijo(nombre, clave, df, salida, formatos, plotlyjs="compartido"):
+    # Igual que renderizar, pero devuelve también las etapas registradas en el
+    # proceso del pool para sumarlas a la traza del padre
+    return con_eventos(renderizar, nombre, clave, df, salida, formatos, plotlyjs)
+
+
+def _renderizar(nombre, clave, df, salida, formatos, plotlyjs):
+    fig = FIGURAS[clave](df)
+    base = os.path.join(salida, nombre)
+    if hasattr(fig, "savefig"):
+        archivos = _guardar_matplotlib(fig, base, formatos)
+    else:
+        archivos = _guardar_plotly(fig, base, formatos, plotlyjs)
+    return {"nombre": nombre, "figura": clave, "filas": int(len(df)),
+            "archivos": [os.path.relpath(a, salida) for a in archivos]}
+
+
+def escribir_indice(resultados, salida):
+    with open(os.path.join(salida, "indice.json"), "w", encoding="utf-8") as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+    filas = []
+    for r in resultados:
+        enlaces = []
+        for a in r["archivos"]:
+            if a.endswith((".png", ".svg")):
+                enlaces.append(f'<a href="{html.escape(a)}"><img src="{html.escape(a)}" height="160"></a>')
+            else:
+                enlaces.append(f'<a href="{html.escape(a)}">{html.escape(a)}</a>')
+        filas.append(f"<tr><td>{html.escape(r['nombre'])}</td><td>{r['filas']}</td><td>{' '.join(enlaces)}</td></tr>")
+
+    with open(os.path.join(salida, "index.html"), "w", encoding="utf-8") as f:
+        f.write("<!DOCTYPE html><html><head><meta charset='utf-8'><title>Reporte de felicidad</title></head><body>\n"
+                "<h1>Reporte World Happiness</h1>\n<table border='1' cellpadding='4'>\n"
+                "<tr><th>Figura</th><th>Filas</th><th>Archivos</th></tr>\n"
+                + "\n".join(filas) + "\n</table></body></html>\n")
+
+
+@medido()
+def generar_reporte(df, salida, formatos=("png", "svg", "html"), procesos=None,
+                    por_anio=False, por_region=False, figuras=None, plotlyjs="compartido"):
+    # plotlyjs="compartido" escribe plotly.min.js una vez y todos los HTML lo referencian
+    os.makedirs(salida, exist_ok=True)
+    tareas = tareas_reporte(df, por_anio=por_anio, por_region=por_region, figuras=figuras)
+    if plotlyjs == "compartido":
+        escribir_plotlyjs(salida)
+
+    # procesos=1 renderiza en el mismo proceso (útil para depurar)
+    if procesos == 1:
+        resultados = [renderizar(n, c, d, salida, formatos, plotlyjs) for n, c, d in tareas]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            futuros = [pool.submit(renderizar_en_hijo, n, c, d, salida, formatos, plotlyjs) for n, c, d in tareas]
+            resultados = []
+            for futuro in futuros:
+                resultado, registrados = futuro.result()
+                incorporar(registrados)
+                resultados.append(resultado)
+
+    escribir_indice(resultados, salida)
+    print(f"📝 Reporte con {len(resultados)} figuras en '{salida}'")
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera todas las figuras del análisis en archivos.")
+    parser.add_argument("--salida", default="reporte", help="Carpeta de salida")
+    parser.add_argument("--formatos", default="png,svg,html", help="Lista separada por comas (png, svg, html)")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos en paralelo (por defecto, todos los núcleos)")
+    parser.add_argument("--por-anio", action="store_true", help="Agrega una variante de cada figura por año")
+    parser.add_argument("--por-region", action="store_true", help="Agrega una variante de cada figura por región")
+    parser.add_argument("--plotlyjs", default="compartido", choices=["compartido", "cdn", "inline"],
+                        help="Cómo incluir plotly.js en los HTML")
+    args = parser.parse_args()
+
+    work_dir, dest_path = cc.preparar_directorios()
+    df_all = cc.cargar_datos(cc.descargar_dataset(work_dir, dest_path, extraer=False))
+    generar_reporte(df_all, args.salida, formatos=tuple(args.formatos.split(",")), procesos=args.procesos,
+                    por_anio=args.por_anio, por_region=args.por_region, plotlyjs=args.plotlyjs)
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+from collections import Counter
+from esquemas import leer_normalizado_por_bloques
+from almacen_datos import anio_de_nombre
+from instrumentacion import medido
+
+# -----------------------------------------------------------
+# Resumen exploratorio por bloques (memoria acotada)
+# -----------------------------------------------------------
+# Acumula en una sola pasada lo que cargar_data.py obtenía con info(),
+# describe(), isnull().sum() y value_counts() sobre el DataFrame completo:
+#   - conteo, nulos, media y varianza por columna numérica, combinables entre
+#     bloques con la fórmula de Chan;
+#   - mínimo y máximo;
+#   - cuantiles aproximados a partir de una muestra uniforme de tamaño fijo
+#     (se guardan los `muestra` valores con menor prioridad aleatoria, así
+#     que dos resúmenes se combinan juntando y recortando). Con menos valores
+#     que `muestra` los cuantiles son exactos;
+#   - tipos y conteos de las columnas categóricas (Region, Country).
+# La memoria depende de `muestra` y de la cantidad de categorías, no de las
+# filas, y dos resúmenes de partes distintas se combinan con combinar().
+
+PERCENTILES = (0.25, 0.5, 0.75)
+MUESTRA = 10_000
+
+
+class ResumenColumnas:
+    def __init__(self, muestra=MUESTRA, semilla=0):
+        self.muestra = muestra
+        self.rng = np.random.default_rng(semilla)
+        self.filas = 0
+        self.tipos = {}
+        self.presentes = {}
+        self.numericas = {}
+        self.categoricas = {}
+        self.primeras = None
+
+    def _tipo(self, columna, tipo):
+        anterior = self.tipos.setdefault(columna, tipo)
+        if anterior != tipo:
+            # Bloques con tipos distintos (p. ej. int16 y float32): el común de numpy
+            try:
+                self.tipos[columna] = str(np.result_type(anterior, tipo))
+            except TypeError:
+                self.tipos[columna] = "object"
+
+    def agregar(self, df, primeras=10):
+        if self.primeras is None:
+            self.primeras = df.head(primeras)
+        self.filas += len(df)
+        for columna in df.columns:
+            serie = df[columna]
+            self._tipo(columna, "category" if isinstance(serie.dtype, pd.CategoricalDtype) else str(serie.dtype))
+            faltan = serie.isna()
+            self.presentes[columna] = self.presentes.get(columna, 0) + len(df) - int(faltan.sum())
+            if pd.api.types.is_numeric_dtype(serie.dtype):
+                valores = serie.to_numpy(dtype=np.float64)[~faltan.to_numpy()]
+                self._combinar_numerica(columna, self._estadisticos(valores))
+            else:
+                conteo = self.categoricas.setdefault(columna, Counter())
+                conteo.update(serie.value_counts(sort=False).loc[lambda s: s > 0].to_dict())
+        return self
+
+    def _estadisticos(self, valores):
+        n = len(valores)
+        if n == 0:
+            return None
+        prioridad = self.rng.random(n)
+        corte = np.argsort(prioridad)[: self.muestra]
+        return {"n": n, "media": valores.mean(), "m2": ((valores - valores.mean()) ** 2).sum(),
+                "min": valores.min(), "max": valores.max(),
+                "muestra": valores[corte], "prioridad": prioridad[corte]}
+
+    def _combinar_numerica(self, columna, nuevo):
+        if nuevo is None:
+            return
+        actual = self.numericas.get(columna)
+        if actual is None:
+            self.numericas[columna] = nuevo
+            return
+        n = actual["n"] + nuevo["n"]
+        delta = nuevo["media"] - actual["media"]
+        muestra = np.concatenate([actual["muestra"], nuevo["muestra"]])
+        prioridad = np.concatenate([actual["prioridad"], nuevo["prioridad"]])
+        corte = np.argsort(prioridad)[: self.muestra]
+        self.numericas[columna] = {
+            "n": n,
+            "media": actual["media"] + delta * nuevo["n"] / n,
+            "m2": actual["m2"] + nuevo["m2"] + delta ** 2 * actual["n"] * nuevo["n"] / n,
+            "min": min(actual["min"], nuevo["min"]),
+            "max": max(actual["max"], nuevo["max"]),
+            "muestra": muestra[corte],
+            "prioridad": prioridad[corte],
+        }
+
+    def combinar(self, otro):
+        # Suma el resumen de otra parte de los datos (otro proceso, otro archivo)
+        if self.primeras is None:
+            self.primeras = otro.primeras
+        self.filas += otro.filas
+        for columna, tipo in otro.tipos.items():
+            self._tipo(columna, tipo)
+        for columna, n in otro.presentes.items():
+            self.presentes[columna] = self.presentes.get(columna, 0) + n
+        for columna, est in otro.numericas.items():
+            self._combinar_numerica(columna, est)
+        for columna, conteo in otro.categoricas.items():
+            self.categoricas.setdefault(columna, Counter()).update(conteo)
+        return self
+
+    # -------------------------------------------------------
+    # Salidas con la forma de pandas
+    # -------------------------------------------------------
+
+    @property
+    def columnas(self):
+        return list(self.tipos)
+
+    def describe(self, percentiles=PERCENTILES):
+        # Mismas filas que DataFrame.describe() (std con ddof=1)
+        filas = ["count", "mean", "std", "min"] + [f"{p * 100:g}%" for p in percentiles] + ["max"]
+        tabla = {}
+        for columna in self.columnas:
+            est = self.numericas.get(columna)
+            if est is None:
+                if columna in self.categoricas or self.tipos[columna] == "category":
+                    continue
+                tabla[columna] = [0.0] + [np.nan] * (len(filas) - 1)
+                continue
+            std = np.sqrt(est["m2"] / (est["n"] - 1)) if est["n"] > 1 else np.nan
+            cuantiles = np.quantile(est["muestra"], percentiles).tolist()
+            tabla[columna] = [est["n"], est["media"], std, est["min"], *cuantiles, est["max"]]
+        return pd.DataFrame(tabla, index=filas, dtype=np.float64)
+
+    def dtypes(self):
+        return pd.Series(self.tipos, dtype=object)
+
+    def isnull_sum(self):
+        # Como en el concat de archivos con esquemas distintos, una columna que
+        # falta en un archivo cuenta como nula en todas sus filas
+        return pd.Series({c: self.filas - self.presentes[c] for c in self.columnas}, dtype=np.int64)
+
+    def value_counts(self, columna):
+        conteo = self.categoricas.get(columna, Counter())
+        return pd.Series(dict(conteo.most_common()), name="count", dtype=np.int64).rename_axis(columna)
+
+    def info(self):
+        # Equivalente en texto de DataFrame.info() (sin el uso de memoria)
+        ancho = max([len("Column")] + [len(str(c)) for c in self.columnas])
+        lineas = ["<class 'pandas.DataFrame'>",
+                  f"RangeIndex: {self.filas} entries, 0 to {self.filas - 1}",
+                  f"Data columns (total {len(self.columnas)} columns):",
+                  f" #   {'Column':<{ancho}}  Non-Null Count  Dtype",
+                  f"---  {'-' * ancho}  --------------  -----"]
+        for i, columna in enumerate(self.columnas):
+            lineas.append(f" {i:<3} {columna:<{ancho}}  {f'{self.presentes[columna]} non-null':<14}  {self.tipos[columna]}")
+        conteo_tipos = Counter(self.tipos.values())
+        lineas.append("dtypes: " + ", ".join(f"{t}({n})" for t, n in sorted(conteo_tipos.items())))
+        return "\n".join(lineas)
+
+
+@medido()
+def resumir_archivos(archivos, filas=100_000, muestra=MUESTRA, semilla=0):
+    # archivos: rutas o MiembroZip; el año sale del nombre, como en cargar_datos.
+    # Devuelve el resumen y, en el orden de `archivos`, la lista de (archivo, error)
+    # con error None para los que se leyeron completos.
+    # Cada archivo se acumula en su propio resumen y se combina solo si se leyó
+    # entero: un archivo que falla a la mitad no deja bloques sueltos en el total.
+    resumen = ResumenColumnas(muestra=muestra, semilla=semilla)
+    resultados = []
+    for i, archivo in enumerate(archivos):
+        parcial = ResumenColumnas(muestra=muestra, semilla=[semilla, i])
+        try:
+            for bloque in leer_normalizado_por_bloques(archivo, anio_de_nombre(str(archivo)), filas):
+                parcial.agregar(bloque)
+        except Exception as e:
+            resultados.append((archivo, e))
+            continue
+        resumen.combinar(parcial)
+        resultados.append((archivo, None))
+    return resumen, resultados
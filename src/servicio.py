@@ -0,0 +1,321 @@
+import json
+import math
+import asyncio
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import numpy as np
+import pandas as pd
+
+from correlaciones import construir_motor, VARIABLES
+from esquemas import FACTORES
+from intervalos import resumir_por_intervalos
+from paises import nombre_canonico
+from rankings import construir_indice
+from similares import construir_indice_similares
+
+# -----------------------------------------------------------
+# Servicio HTTP con los datos en memoria (opcional)
+# -----------------------------------------------------------
+# Carga la salida de cargar_datos una sola vez en un almacén compacto
+# (matriz float32 + índices por país/año, índice de rankings y motor de
+# correlaciones) y responde JSON sobre HTTP/1.1 con keep-alive, usando solo
+# asyncio de la librería estándar. Ninguna petición vuelve a leer los CSV, y
+# como los datos no cambian las respuestas se guardan en una caché LRU.
+#
+#   python src/cli.py servir --puerto 8765
+#   curl "localhost:8765/pais/Finland?anio=2018"
+#   curl "localhost:8765/ranking?anio=2016&region=Western%20Europe&k=10"
+#   curl "localhost:8765/correlaciones?anio=2018&region=Western%20Europe"
+#   curl "localhost:8765/cuartiles?factor=Corruption&anio=2019"
+#   curl "localhost:8765/cuartiles?factor=GDP&bins=5&metodo=ancho"
+#   curl "localhost:8765/cambios?desde=2018&hasta=2019&k=5&bajadas=1"
+#   curl "localhost:8765/similares/Costa%20Rica?k=5&entre_anios=1"
+
+MAX_RESPUESTAS = 4096
+MAX_BINS = 100
+
+
+class ErrorPeticion(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def _limpiar(valor):
+    # JSON estricto: NaN → null y tipos de numpy → tipos de Python. Los float32
+    # pasan por su representación más corta (7.632 y no 7.631999969482422)
+    if isinstance(valor, dict):
+        return {str(k): _limpiar(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_limpiar(v) for v in valor]
+    if isinstance(valor, np.float32):
+        valor = float(str(valor))
+    elif isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    return valor
+
+
+def _registros(df):
+    return json.loads(df.to_json(orient="records", double_precision=6))
+
+
+def _entero(params, nombre, defecto=None, minimo=None, maximo=None):
+    if nombre not in params:
+        return defecto
+    try:
+        valor = int(params[nombre])
+    except ValueError:
+        raise ErrorPeticion(400, f"'{nombre}' debe ser un entero") from None
+    if minimo is not None and valor < minimo:
+        raise ErrorPeticion(400, f"'{nombre}' debe ser al menos {minimo}")
+    if maximo is not None and valor > maximo:
+        raise ErrorPeticion(400, f"'{nombre}' debe ser a lo sumo {maximo}")
+    return valor
+
+
+class DatosEnMemoria:
+    def __init__(self, df):
+        self.variables = [v for v in VARIABLES if v in df.columns]
+        self.valores = df[self.variables].to_numpy(dtype=np.float32)
+        self.anios = df["Year"].to_numpy()
+        self.paises = df["Country"].astype(str).to_numpy()
+        self.regiones = (df["Region"].astype(object).to_numpy() if "Region" in df.columns
+                         else np.full(len(df), None, dtype=object))
+        self.filas = {}
+        for i, (pais, year) in enumerate(zip(self.paises, self.anios.tolist())):
+            self.filas.setdefault(pais, {})[year] = i
+        self.indice = construir_indice(df)
+        self.motor = construir_motor(df)
+        self.similares = construir_indice_similares(df)
+
+    def resolver_pais(self, nombre):
+        if nombre in self.filas:
+            return nombre
+        canonico = nombre_canonico(nombre)
+        if canonico in self.filas:
+            return canonico
+        raise ErrorPeticion(404, f"País desconocido: {nombre!r}")
+
+    def fila(self, i):
+        return _limpiar({
+            "Country": self.paises[i],
+            "Region": self.regiones[i],
+            "Year": self.anios[i],
+            **dict(zip(self.variables, self.valores[i])),
+        })
+
+    def corte(self, year=None, region=None):
+        mascara = np.ones(len(self.anios), dtype=bool)
+        if year is not None:
+            mascara &= self.anios == year
+        if region is not None:
+            mascara &= self.regiones == region
+        return np.flatnonzero(mascara)
+
+
+class Servicio:
+    def __init__(self, datos):
+        self.datos = datos
+        self.rutas = {
+            "salud": self.salud,
+            "paises": self.listar_paises,
+            "pais": self.pais,
+            "ranking": self.ranking,
+            "cambios": self.cambios,
+            "correlaciones": self.correlaciones,
+            "cuartiles": self.cuartiles,
+            "similares": self.similares,
+        }
+        self._respuestas = OrderedDict()
+
+    # -------------------------------------------------------
+    # Endpoints
+    # -------------------------------------------------------
+
+    def salud(self, params):
+        return {"ok": True, "filas": len(self.datos.anios), "anios": self.datos.indice.anios}
+
+    def listar_paises(self, params):
+        return sorted(self.datos.filas)
+
+    def pais(self, params, nombre=None):
+        if not nombre:
+            raise ErrorPeticion(400, "Falta el país: /pais/<nombre>")
+        pais = self.datos.resolver_pais(nombre)
+        por_anio = self.datos.filas[pais]
+        year = _entero(params, "anio")
+        if year is None:
+            return [self.datos.fila(i) for _, i in sorted(por_anio.items())]
+        if year not in por_anio:
+            raise ErrorPeticion(404, f"{pais} no tiene datos en {year}")
+        fila = self.datos.fila(por_anio[year])
+        fila["Rank"] = self.datos.indice.rango(pais, year)
+        return fila
+
+    def ranking(self, params):
+        try:
+            tabla = self.datos.indice.top(_entero(params, "k", 10, minimo=1), year=_entero(params, "anio"),
+                                          region=params.get("region"))
+        except KeyError as e:
+            raise ErrorPeticion(404, e.args[0]) from None
+        return _registros(tabla)
+
+    def cambios(self, params):
+        try:
+            tabla = self.datos.indice.mayores_cambios(_entero(params, "k", 10, minimo=1),
+                                                      desde=_entero(params, "desde"), hasta=_entero(params, "hasta"),
+                                                      bajadas=params.get("bajadas") in ("1", "true", "si"))
+        except KeyError as e:
+            raise ErrorPeticion(404, e.args[0]) from None
+        except ValueError as e:
+            raise ErrorPeticion(400, str(e)) from None
+        return _registros(tabla)
+
+    def correlaciones(self, params):
+        filtro = {}
+        if "anio" in params:
+            filtro["Year"] = _entero(params, "anio")
+        if "region" in params:
+            filtro["Region"] = params["region"]
+        objetivo = params.get("objetivo", "Happiness")
+        if objetivo not in self.datos.motor.variables:
+            raise ErrorPeticion(400, f"Variable desconocida: {objetivo!r}")
+        est = self.datos.motor.estadisticas(**filtro)
+        i = self.datos.motor.variables.index(objetivo)
+        serie = self.datos.motor.con_objetivo(objetivo, **filtro)
+        return {"filtro": filtro, "objetivo": objetivo, "n": int(est.n[i, i]),
+                "correlaciones": _limpiar(serie.to_dict())}
+
+    def cuartiles(self, params):
+        # Felicidad promedio por intervalo del factor (Corruption se invierte como
+        # en el análisis); bins y metodo ("cuantil" o "ancho") son opcionales
+        factor = params.get("factor", "Corruption")
+        if factor not in FACTORES:
+            raise ErrorPeticion(400, f"Factor desconocido: {factor!r}. Opciones: {FACTORES}")
+        filas = self.datos.corte(_entero(params, "anio"), params.get("region"))
+        if len(filas) == 0:
+            raise ErrorPeticion(404, "El corte no tiene filas")
+        j = self.datos.variables.index(factor)
+        columnas = pd.DataFrame({factor: self.datos.valores[filas, j], "Happiness": self.datos.valores[filas, 0]},
+                                copy=False)
+        try:
+            tabla = resumir_por_intervalos(columnas, [factor], bins=_entero(params, "bins", 4, minimo=1, maximo=MAX_BINS),
+                                           metodo=params.get("metodo", "cuantil"), invertir=("Corruption",))
+        except ValueError as e:
+            raise ErrorPeticion(400, str(e)) from None
+        return {"factor": factor, "n": int(len(filas)),
+                "grupos": _registros(tabla.drop(columns=["factor", "intervalo"]))}
+
+    def similares(self, params, nombre=None):
+        # k países con el perfil de factores más parecido (ver similares.py)
+        if not nombre:
+            raise ErrorPeticion(400, "Falta el país: /similares/<nombre>")
+        pais = self.datos.resolver_pais(nombre)
+        try:
+            tabla = self.datos.similares.vecinos(pais, year=_entero(params, "anio"),
+                                                 k=_entero(params, "k", 5, minimo=1),
+                                                 entre_anios=params.get("entre_anios") in ("1", "true", "si"))
+        except KeyError as e:
+            raise ErrorPeticion(404, e.args[0]) from None
+        return {"pais": pais, "vecinos": _registros(tabla)}
+
+    # -------------------------------------------------------
+    # HTTP
+    # -------------------------------------------------------
+
+    def responder(self, metodo, objetivo):
+        if metodo != "GET":
+            return 405, {"error": "Solo se admite GET"}
+        partes = urlsplit(objetivo)
+        clave = (partes.path, partes.query)
+        if clave in self._respuestas:
+            self._respuestas.move_to_end(clave)
+            return self._respuestas[clave]
+
+        segmentos = [unquote(s) for s in partes.path.strip("/").split("/") if s]
+        params = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+        nombre = segmentos[0] if segmentos else "salud"
+        ruta = self.rutas.get(nombre)
+        try:
+            # Solo /pais/<nombre> y /similares/<nombre> llevan un segmento extra
+            if ruta is None or len(segmentos) > (2 if nombre in ("pais", "similares") else 1):
+                raise ErrorPeticion(404, f"Ruta desconocida: {partes.path}. Opciones: {sorted(self.rutas)}")
+            respuesta = 200, ruta(params, *segmentos[1:])
+        except ErrorPeticion as e:
+            return e.estado, {"error": str(e)}
+        except Exception as e:
+            # Un error inesperado responde 500 en lugar de cortar la conexión
+            return 500, {"error": f"Error interno: {type(e).__name__}: {e}"}
+
+        # Solo se guardan las respuestas correctas: las peticiones inválidas no
+        # desplazan entradas útiles de la caché
+        self._respuestas[clave] = respuesta
+        if len(self._respuestas) > MAX_RESPUESTAS:
+            self._respuestas.popitem(last=False)
+        return respuesta
+
+    async def atender(self, reader, writer):
+        # Una conexión puede llevar varias peticiones (keep-alive de HTTP/1.1)
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                try:
+                    metodo, objetivo, version = linea.decode("latin-1").split()
+                except ValueError:
+                    break
+                encabezados = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    nombre, _, valor = h.decode("latin-1").partition(":")
+                    encabezados[nombre.strip().lower()] = valor.strip().lower()
+                conexion = encabezados.get("connection", "")
+                mantener = conexion == "keep-alive" or (version == "HTTP/1.1" and conexion != "close")
+                try:
+                    largo = int(encabezados.get("content-length", 0) or 0)
+                    if largo < 0:
+                        raise ValueError
+                except ValueError:
+                    # Sin un largo válido no se sabe dónde termina el cuerpo: se
+                    # responde 400 y se cierra la conexión
+                    estado, contenido = 400, {"error": "Content-Length inválido"}
+                    mantener = False
+                else:
+                    if largo:
+                        await reader.readexactly(largo)
+                    estado, contenido = self.responder(metodo, objetivo)
+
+                cuerpo = json.dumps(contenido, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {estado} {'OK' if estado == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(cuerpo)}\r\n"
+                    f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n".encode("latin-1") + cuerpo)
+                await writer.drain()
+                if not mantener:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _servir(servicio, host, puerto):
+    servidor = await asyncio.start_server(servicio.atender, host, puerto)
+    print(f"🚀 Servicio en http://{host}:{puerto} (Ctrl+C para detener)")
+    async with servidor:
+        await servidor.serve_forever()
+
+
+def servir(df, host="127.0.0.1", puerto=8765):
+    servicio = Servicio(DatosEnMemoria(df))
+    try:
+        asyncio.run(_servir(servicio, host, puerto))
+    except KeyboardInterrupt:
+        print("\n👋 Servicio detenido")
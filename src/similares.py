@@ -0,0 +1,292 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from esquemas import FACTORES, VERSION_REGISTRO
+from cache_datos import directorio_cache, VERSION_CACHE
+from paises import nombre_canonico, PAISES_ISO3, ALIAS, VERSION_INDICE
+
+# -----------------------------------------------------------
+# Países con perfil de factores parecido (k vecinos más cercanos)
+# -----------------------------------------------------------
+# Cada fila (país, año) es un punto en el espacio de los factores
+# estandarizados con la media y el desvío de todas las filas, así que las
+# distancias son comparables entre años. Un valor faltante queda en la media
+# (z = 0). Las distancias se calculan por bloques de consultas con
+# ‖q - z‖² = ‖q‖² + ‖z‖² - 2·q·z (un producto de matrices por bloque y
+# argpartition para los k menores), sin armar la matriz completa.
+#
+# Como el motor de correlaciones, el índice guarda por factor el conteo, la
+# media y la suma de cuadrados centrada (M2), que se combinan con la fórmula
+# de Chan: agregar un año nuevo solo procesa sus filas (y quitar uno deshace
+# su aporte) y vuelve a estandarizar la matriz (una operación vectorizada),
+# sin releer los años anteriores. En disco se guarda con la huella de cada año, y al cargarlo
+# solo se reemplazan los años cuyo CSV cambió y se agregan los nuevos. Si
+# cambió la normalización (VERSION_CACHE, VERSION_REGISTRO) o la tabla de
+# países y alias, el índice guardado se descarta y se reconstruye.
+
+# Subir cuando cambie el formato del archivo o la forma de construir el índice
+VERSION_SIMILARES = 2
+BLOQUE = 2048
+
+
+def _momentos(X):
+    # n, media y M2 de cada columna sobre las celdas presentes (dos pasadas)
+    presentes = ~np.isnan(X)
+    n = presentes.sum(axis=0).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = np.where(n > 0, np.where(presentes, X, 0).sum(axis=0) / n, 0.0)
+    m2 = np.where(presentes, (X - media) ** 2, 0).sum(axis=0)
+    return n, media, m2
+
+
+def version_datos():
+    # Todo lo que cambia los valores o los nombres que entran al índice
+    tabla = json.dumps([PAISES_ISO3, ALIAS], sort_keys=True, ensure_ascii=False)
+    return json.dumps({"similares": VERSION_SIMILARES, "cache": VERSION_CACHE, "registro": VERSION_REGISTRO,
+                       "paises": VERSION_INDICE, "tabla_paises": hashlib.sha256(tabla.encode()).hexdigest()})
+
+
+def archivo_cache():
+    return os.path.join(directorio_cache(), "similares.npz")
+
+
+class IndiceSimilares:
+    def __init__(self, factores=FACTORES):
+        self.factores = list(factores)
+        p = len(self.factores)
+        self.X = np.empty((0, p))
+        self.paises = np.empty(0, dtype=object)
+        self.regiones = np.empty(0, dtype=object)
+        self.anios = np.empty(0, dtype=np.int64)
+        self.felicidad = np.empty(0)
+        self.huellas = {}
+        self.n = np.zeros(p)
+        self.media = np.zeros(p)
+        self.m2 = np.zeros(p)
+        self._estandarizar()
+
+    # -------------------------------------------------------
+    # Construcción incremental
+    # -------------------------------------------------------
+
+    def agregar(self, df, huellas=None):
+        # Agrega las filas de df; los años que ya estaban se reemplazan
+        anios = df["Year"].to_numpy().astype(np.int64)
+        self._quitar(np.unique(anios).tolist())
+        X = df[self.factores].to_numpy(dtype=np.float64)
+        self._sumar_momentos(*_momentos(X))
+
+        regiones = (df["Region"].astype(object).to_numpy() if "Region" in df.columns
+                    else np.full(len(df), None, dtype=object))
+        felicidad = (df["Happiness"].to_numpy(dtype=np.float64) if "Happiness" in df.columns
+                     else np.full(len(df), np.nan))
+        self.X = np.concatenate([self.X, X])
+        self.paises = np.concatenate([self.paises, df["Country"].astype(str).to_numpy(dtype=object)])
+        self.regiones = np.concatenate([self.regiones, regiones])
+        self.anios = np.concatenate([self.anios, anios])
+        self.felicidad = np.concatenate([self.felicidad, felicidad])
+        self.huellas.update(huellas or {})
+        self._estandarizar()
+        return self
+
+    def quitar_anios(self, anios):
+        self._quitar(anios)
+        self._estandarizar()
+        return self
+
+    def _quitar(self, anios):
+        quitar = np.isin(self.anios, anios)
+        if quitar.any():
+            self._restar_momentos(*_momentos(self.X[quitar]))
+            quedan = ~quitar
+            self.X, self.paises, self.regiones = self.X[quedan], self.paises[quedan], self.regiones[quedan]
+            self.anios, self.felicidad = self.anios[quedan], self.felicidad[quedan]
+        for year in anios:
+            self.huellas.pop(int(year), None)
+
+    def _sumar_momentos(self, n, media, m2):
+        total = self.n + n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = media - self.media
+            self.media = np.where(total > 0, self.media + delta * n / total, 0.0)
+            self.m2 = np.where(total > 0, self.m2 + m2 + delta ** 2 * self.n * n / total, 0.0)
+        self.n = total
+
+    def _restar_momentos(self, n, media, m2):
+        # Inversa de _sumar_momentos: quita un subconjunto de las filas acumuladas
+        quedan = self.n - n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            nueva = self.media + (self.media - media) * n / quedan
+            m2_resto = self.m2 - m2 - (media - nueva) ** 2 * quedan * n / self.n
+            self.media = np.where(quedan > 0, nueva, 0.0)
+            self.m2 = np.where(quedan > 0, np.maximum(m2_resto, 0.0), 0.0)
+        self.n = quedan
+
+    def _estandarizar(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.desvio = np.sqrt(self.m2 / (self.n - 1))
+            Z = (self.X - self.media) / self.desvio
+        self.Z = np.nan_to_num(Z, nan=0.0, posinf=0.0, neginf=0.0).astype(np.float32)
+        self.normas = np.einsum("ij,ij->i", self.Z, self.Z)
+        # Filas de cada año y de cada país, en el orden de la matriz
+        self.filas_anio = pd.Series(np.arange(len(self.anios))).groupby(self.anios).indices if len(self.anios) else {}
+        self.filas_pais = {}
+        for i, pais in enumerate(self.paises.tolist()):
+            self.filas_pais.setdefault(pais, []).append(i)
+        # Código entero de país para excluir al mismo país sin comparar cadenas
+        self.cod_pais = pd.factorize(self.paises)[0] if len(self.paises) else np.empty(0, dtype=np.intp)
+
+    # -------------------------------------------------------
+    # Consultas
+    # -------------------------------------------------------
+
+    def _fila(self, pais, year=None):
+        if pais not in self.filas_pais:
+            pais = nombre_canonico(pais) or pais
+        if pais not in self.filas_pais:
+            raise KeyError(f"País desconocido: {pais!r}")
+        filas = self.filas_pais[pais]
+        if year is None:
+            return max(filas, key=lambda i: self.anios[i])
+        for i in filas:
+            if self.anios[i] == year:
+                return i
+        raise KeyError(f"{pais} no tiene datos en {year}")
+
+    def _candidatos(self, year=None):
+        if year is None:
+            return np.arange(len(self.anios))
+        if year not in self.filas_anio:
+            raise KeyError(f"No hay datos para {year}. Años disponibles: {sorted(self.filas_anio)}")
+        return self.filas_anio[year]
+
+    def k_vecinos(self, consultas, candidatos, k, bloque=BLOQUE):
+        # Para cada fila consultada, los k candidatos más cercanos que no son
+        # el mismo país. Devuelve (índices, distancias), ambos (consultas, k).
+        if k < 1:
+            raise ValueError(f"k debe ser al menos 1 (se pidió {k})")
+        consultas, candidatos = np.asarray(consultas), np.asarray(candidatos)
+        if len(candidatos) == len(self.anios) and np.array_equal(candidatos, np.arange(len(self.anios))):
+            # Todas las filas (entre años): vistas, sin copiar la matriz
+            Zc, nc, pais_c = self.Z, self.normas, self.cod_pais
+        else:
+            Zc, nc, pais_c = self.Z[candidatos], self.normas[candidatos], self.cod_pais[candidatos]
+        k = min(k, len(candidatos))
+        indices = np.empty((len(consultas), k), dtype=np.int64)
+        distancias = np.empty((len(consultas), k))
+        if k == 0:
+            # Sin candidatos
+            return indices, distancias
+        for inicio in range(0, len(consultas), bloque):
+            q = consultas[inicio:inicio + bloque]
+            d2 = self.normas[q][:, None] + nc[None, :] - 2.0 * (self.Z[q] @ Zc.T)
+            d2[self.cod_pais[q][:, None] == pais_c[None, :]] = np.inf
+            mejores = (np.argpartition(d2, k - 1, axis=1)[:, :k] if k < len(candidatos)
+                       else np.argsort(d2, axis=1))
+            d_mejores = np.take_along_axis(d2, mejores, axis=1)
+            orden = np.argsort(d_mejores, axis=1, kind="stable")
+            indices[inicio:inicio + bloque] = candidatos[np.take_along_axis(mejores, orden, axis=1)]
+            distancias[inicio:inicio + bloque] = np.sqrt(np.maximum(np.take_along_axis(d_mejores, orden, axis=1), 0))
+        return indices, distancias
+
+    def vecinos(self, pais, year=None, k=5, entre_anios=False):
+        # Los k países con el perfil más parecido al de `pais` en `year` (por
+        # defecto su último año). Con entre_anios=True se compara contra
+        # todas las filas (país, año) de otros países.
+        i = self._fila(pais, year)
+        candidatos = self._candidatos(None if entre_anios else int(self.anios[i]))
+        indices, distancias = self.k_vecinos([i], candidatos, k)
+        indices, distancias = indices[0], distancias[0]
+        validos = np.isfinite(distancias)
+        return self._tabla(indices[validos], distancias[validos])
+
+    def todos_los_vecinos(self, k=5, year=None, entre_anios=False):
+        # Tabla larga con los k vecinos de cada país de `year` (o de todas las
+        # filas), calculada por bloques
+        if year is None and not entre_anios:
+            partes = [self.todos_los_vecinos(k, year=int(a)) for a in sorted(self.filas_anio)]
+            return pd.concat(partes, ignore_index=True)
+        consultas = self._candidatos(year)
+        candidatos = self._candidatos(None if entre_anios else year)
+        indices, distancias = self.k_vecinos(consultas, candidatos, k)
+        validos = np.isfinite(distancias)
+        origen = np.repeat(consultas, indices.shape[1]).reshape(indices.shape)[validos]
+        tabla = self._tabla(indices[validos], distancias[validos])
+        tabla.insert(0, "Origen", self.paises[origen])
+        tabla.insert(1, "AnioOrigen", self.anios[origen])
+        return tabla
+
+    def _tabla(self, indices, distancias):
+        return pd.DataFrame({
+            "Country": self.paises[indices],
+            "Region": self.regiones[indices],
+            "Year": self.anios[indices],
+            "Distancia": distancias,
+            "Happiness": self.felicidad[indices],
+        })
+
+    def perfil(self, pais, year=None):
+        # Factores estandarizados de una fila, para mostrar junto a sus vecinos
+        i = self._fila(pais, year)
+        return pd.Series(self.Z[i], index=self.factores, name=f"{self.paises[i]} {self.anios[i]}")
+
+    # -------------------------------------------------------
+    # Persistencia
+    # -------------------------------------------------------
+
+    def guardar(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        anios_huella = sorted(self.huellas)
+        np.savez(path, version=np.array(version_datos()), factores=np.array(self.factores), X=self.X, paises=self.paises.astype(str),
+                 regiones=np.array(["" if r is None or r != r else str(r) for r in self.regiones]),
+                 anios=self.anios, felicidad=self.felicidad, n=self.n, media=self.media, m2=self.m2,
+                 huella_anios=np.array(anios_huella, dtype=np.int64),
+                 huella_valores=np.array([self.huellas[a] for a in anios_huella]))
+
+    @classmethod
+    def cargar(cls, path):
+        with np.load(path) as datos:
+            return cls._desde_npz(datos)
+
+    @classmethod
+    def _desde_npz(cls, datos):
+        indice = cls(datos["factores"].tolist())
+        indice.X = datos["X"]
+        indice.paises = datos["paises"].astype(object)
+        indice.regiones = np.array([r or None for r in datos["regiones"].tolist()], dtype=object)
+        indice.anios, indice.felicidad = datos["anios"], datos["felicidad"]
+        indice.n, indice.media, indice.m2 = datos["n"], datos["media"], datos["m2"]
+        indice.huellas = dict(zip(datos["huella_anios"].tolist(), datos["huella_valores"].tolist()))
+        indice._estandarizar()
+        return indice
+
+
+def construir_indice_similares(df, factores=FACTORES):
+    return IndiceSimilares(factores).agregar(df)
+
+
+def indice_similares_cacheado(df, huellas, path=None):
+    # huellas: {año: hash del CSV}. Se reutiliza el índice guardado y solo se
+    # procesan los años nuevos o cambiados; los que ya no están se quitan.
+    path = path or archivo_cache()
+    indice = None
+    if os.path.exists(path):
+        try:
+            with np.load(path) as datos:
+                vigente = "version" in datos and datos["version"].item() == version_datos()
+            indice = IndiceSimilares.cargar(path) if vigente else None
+        except (OSError, ValueError, KeyError):
+            indice = None
+    if indice is None or indice.factores != list(FACTORES):
+        indice = IndiceSimilares()
+
+    sobran = [a for a in indice.huellas if a not in huellas]
+    cambiados = [a for a, h in huellas.items() if indice.huellas.get(a) != h]
+    indice.quitar_anios(sobran + [a for a in np.unique(indice.anios).tolist() if a not in indice.huellas])
+    if cambiados:
+        indice.agregar(df[df["Year"].isin(cambiados)], {a: huellas[a] for a in cambiados})
+    if sobran or cambiados:
+        indice.guardar(path)
+    return indice
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from panel import Panel, construir_panel
+
+# -----------------------------------------------------------
+# Tendencia lineal de cada país (felicidad y factores)
+# -----------------------------------------------------------
+# Ajusta valor ~ año por mínimos cuadrados para todos los países y variables
+# a la vez sobre el panel (países, años, variables): las sumas n, Σx, Σy,
+# Σxx, Σxy y Σyy se acumulan sobre el eje de años usando solo las celdas
+# presentes, así que un país al que le faltan años se ajusta con los que
+# tiene (y el eje x son los años reales, no posiciones). De esas sumas salen
+# pendiente, intercepto, R², error estándar y el valor p de la prueba t de
+# la pendiente (n - 2 grados de libertad), sin groupby ni bucles por país.
+# Los años se centran antes de sumar para no perder precisión.
+
+NIVEL_SIGNIFICANCIA = 0.05
+
+
+def _valores_p(t, gl):
+    # Valor p bilateral de la prueba t (requiere scipy, como valor_p_pearson)
+    from scipy.stats import t as distribucion_t
+    p = np.full(t.shape, np.nan)
+    validos = np.isfinite(t) & (gl > 0)
+    p[validos] = 2 * distribucion_t.sf(np.abs(t[validos]), gl[validos])
+    return p
+
+
+def ajustar_tendencias(valores, anios):
+    # valores: (países, años, variables) con NaN en las celdas ausentes.
+    # Devuelve un dict de arreglos (países, variables).
+    Y = np.asarray(valores, dtype=np.float64)
+    presentes = ~np.isnan(Y)
+    x = np.asarray(anios, dtype=np.float64)
+    x = (x - x.mean())[None, :, None]
+    X = np.where(presentes, x, 0.0)
+    Y0 = np.where(presentes, Y, 0.0)
+
+    n = presentes.sum(axis=1).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media_x = X.sum(axis=1) / n
+        media_y = Y0.sum(axis=1) / n
+        # Sumas de cuadrados alrededor de la media de cada país y variable
+        dx = np.where(presentes, X - media_x[:, None, :], 0.0)
+        dy = np.where(presentes, Y0 - media_y[:, None, :], 0.0)
+        sxx = (dx * dx).sum(axis=1)
+        sxy = (dx * dy).sum(axis=1)
+        syy = (dy * dy).sum(axis=1)
+
+        pendiente = sxy / sxx
+        intercepto = media_y - pendiente * (media_x + np.mean(anios))
+        sse = np.maximum(syy - pendiente * sxy, 0.0)
+        r2 = np.where(syy > 0, 1 - sse / syy, np.nan)
+        gl = n - 2
+        error_std = np.sqrt(sse / gl / sxx)
+        t = pendiente / error_std
+    # Con dos años la recta pasa por ambos puntos: hay pendiente pero no prueba
+    pendiente[n < 2] = np.nan
+    intercepto[n < 2] = np.nan
+    error_std[gl < 1] = np.nan
+    t[gl < 1] = np.nan
+    return {"n": n.astype(np.int64), "pendiente": pendiente, "intercepto": intercepto, "r2": r2,
+            "error_std": error_std, "p_valor": _valores_p(t, gl)}
+
+
+def tendencias_por_pais(df, variables=None, nivel=NIVEL_SIGNIFICANCIA):
+    # Tabla ordenada: una fila por (país, variable). Acepta el DataFrame largo
+    # de cargar_datos o un Panel ya construido.
+    panel = df if isinstance(df, Panel) else construir_panel(df, variables)
+    ajuste = ajustar_tendencias(panel.valores, panel.anios)
+    n_p, n_v = ajuste["n"].shape
+
+    p_idx, v_idx = np.divmod(np.arange(n_p * n_v), n_v)
+    tabla = pd.DataFrame({
+        "Country": pd.Categorical.from_codes(p_idx, categories=panel.paises),
+        "variable": np.array(panel.variables, dtype=object)[v_idx],
+        **{campo: valores.ravel() for campo, valores in ajuste.items()},
+    })
+    if panel.regiones is not None:
+        tabla.insert(1, "Region", pd.Categorical.from_codes(panel.regiones.codes[p_idx],
+                                                            categories=panel.regiones.categories))
+    tabla["significativo"] = tabla["p_valor"] < nivel
+    return tabla[tabla["n"] >= 2].reset_index(drop=True)